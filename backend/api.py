@@ -0,0 +1,70 @@
+import hmac
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.controllers import BaseController
+from backend.database import get_db
+from backend.models import Product, UserRole
+from backend.profiling import ProfiledRoute
+from backend.repositories import UserRepository
+from backend.services import RecommendationService
+
+# Ответы собираются в JSONResponse напрямую: без jsonable_encoder и валидации модели ответа,
+# Starlette сериализует их компактно (без пробелов).
+router = APIRouter(prefix="/api", route_class=ProfiledRoute)
+
+class BatchRequest(BaseModel):
+    client_ids: List[str]
+    limit: int = settings.API_DEFAULT_LIMIT
+
+def _is_service(request: Request) -> bool:
+    if not settings.API_TOKEN: return False
+    return hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {settings.API_TOKEN}")
+
+def _clamp(limit: int) -> int:
+    return max(1, min(limit, settings.API_MAX_LIMIT))
+
+def _serialize(items: List[Tuple[Product, Optional[float]]]) -> dict:
+    # столбцами, а не списком объектов: ключи не повторяются для каждого товара
+    return {
+        "product_ids": [p.id for p, _ in items],
+        "scores": [round(score, 6) if score is not None else None for _, score in items],
+    }
+
+@router.get("/recommendations")
+def api_recommendations(request: Request, limit: int = settings.API_DEFAULT_LIMIT, client_id: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Рекомендации текущего клиента (cookie сессии) или, для сервиса с API_TOKEN, клиента client_id.
+    """
+    if client_id is not None:
+        # чужие рекомендации - только сервису; молча отдать рекомендации текущего клиента нельзя
+        if not _is_service(request): raise HTTPException(status_code=403, detail="client_id requires a service token")
+        client = UserRepository(db).get_by_id_and_role(client_id, UserRole.CLIENT)
+        if not client: raise HTTPException(status_code=404, detail="Client not found")
+    else:
+        client = BaseController(db).get_current_user(request)
+        if not client or client.role != UserRole.CLIENT: raise HTTPException(status_code=401)
+    items = RecommendationService(db).get_scored_recommendations(client, _clamp(limit))
+    return JSONResponse({"client_id": client.id, **_serialize(items)})
+
+@router.post("/recommendations/batch")
+def api_recommendations_batch(request: Request, body: BatchRequest, db: Session = Depends(get_db)):
+    """
+    Рекомендации для многих клиентов за один запрос (сервисы с API_TOKEN или администратор).
+    Неизвестные id возвращаются в "missing".
+    """
+    if not _is_service(request):
+        user = BaseController(db).get_current_user(request)
+        if not user or user.role != UserRole.ADMIN: raise HTTPException(status_code=401)
+    client_ids = list(dict.fromkeys(body.client_ids))
+    if len(client_ids) > settings.API_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {settings.API_MAX_BATCH} client ids per request")
+    clients = UserRepository(db).get_clients(client_ids)
+    batch = RecommendationService(db).get_batch_recommendations(clients, _clamp(body.limit))
+    return JSONResponse({
+        "recommendations": {cid: _serialize(items) for cid, items in batch.items()},
+        "missing": [cid for cid in client_ids if cid not in batch],
+    })
@@ -0,0 +1,110 @@
+import hmac
+import time
+import hashlib
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from backend.config import settings
+from backend.models import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIE = "session"
+
+def _secret_key() -> bytes:
+    if settings.SECRET_KEY:
+        return settings.SECRET_KEY.encode()
+    logger.warning("SECRET_KEY is not set: using a random key for this process. "
+                   "Sessions will not survive a restart or work across workers - set SECRET_KEY in production.")
+    return secrets.token_bytes(32)
+
+_SECRET = _secret_key()
+
+def password_stamp(password_hash: Optional[str]) -> str:
+    """
+    Отпечаток пароля в токене: смена пароля делает недействительными все выданные сессии.
+    """
+    return hmac.new(_SECRET, (password_hash or "").encode(), hashlib.sha256).hexdigest()[:16]
+
+def make_session_token(user: User) -> str:
+    payload = f"{user.id}.{user.role.value}.{int(time.time())}.{password_stamp(user.password_hash)}"
+    return f"{payload}.{_sign(payload)}"
+
+def verify_session_token(token: Optional[str]) -> Optional[Tuple[str, UserRole, str]]:
+    """
+    Возвращает (user_id, role, отпечаток пароля) для токена с корректной подписью,
+    выданного не раньше SESSION_MAX_AGE сек. назад, иначе None.
+    Отпечаток сверяет вызывающий код с текущим пользователем.
+    """
+    if not token or token.count(".") != 4: return None
+    payload, signature = token.rsplit(".", 1)
+    if not hmac.compare_digest(signature, _sign(payload)): return None
+    user_id, role, issued_at, stamp = payload.split(".")
+    try:
+        if time.time() - int(issued_at) > settings.SESSION_MAX_AGE: return None
+        return user_id, UserRole(role), stamp
+    except ValueError:
+        return None
+
+def set_session_cookie(response, user: User):
+    response.set_cookie(SESSION_COOKIE, make_session_token(user), max_age=settings.SESSION_MAX_AGE, httponly=True)
+
+def _sign(payload: str) -> str:
+    return hmac.new(_SECRET, payload.encode(), hashlib.sha256).hexdigest()
+
+class ProfileIdentity:
+    def __init__(self, interests):
+        self.interests = list(interests or [])
+
+class UserIdentity:
+    """
+    Снимок пользователя для read-only маршрутов и шаблонов (не привязан к сессии БД).
+    Для изменения пользователя нужна ORM-сущность (BaseController.load_current_user).
+    """
+    def __init__(self, user: User):
+        self.id = user.id
+        self.username = user.username
+        self.role = user.role
+        self.full_name = getattr(user, "full_name", None)
+        self.gender = getattr(user, "gender", None)
+        self.organization_name = getattr(user, "organization_name", None)
+        profile = getattr(user, "profile", None)
+        self.profile = ProfileIdentity(profile.interests) if profile else None
+        self.password_stamp = password_stamp(user.password_hash)
+
+class IdentityCache:
+    """
+    LRU-кэш UserIdentity с ограниченным временем жизни записей.
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[str, Tuple[float, UserIdentity]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[UserIdentity]:
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is None: return None
+            created_at, identity = item
+            if time.monotonic() - created_at > self.ttl:
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+            return identity
+
+    def put(self, identity: UserIdentity) -> UserIdentity:
+        with self._lock:
+            self._items[identity.id] = (time.monotonic(), identity)
+            self._items.move_to_end(identity.id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return identity
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+identity_cache = IdentityCache(settings.SESSION_CACHE_SIZE, settings.SESSION_CACHE_TTL)
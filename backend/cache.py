@@ -0,0 +1,80 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from backend.config import settings
+from backend.database import SessionLocal
+from backend.models import Product, AppConfig
+from backend.repositories import ProductRepository, PopularityRepository, NeighborRepository, RecommendationListRepository, CatalogVersionRepository
+from backend.strategies import DEFAULT_WEIGHTS, compute_global_popularity
+from backend.vectorized import CatalogIndex
+
+class CatalogSnapshot:
+    """
+    Неизменяемый срез каталога для рекомендаций: товары (отсоединённые от сессии),
+    текущие веса алгоритма, нормализованный вектор популярности, похожие товары
+    номер актуального поколения предрассчитанных рекомендаций и версия каталога, с которой срез построен.
+    """
+    def __init__(self, products: List[Product], weights: Dict[str, float], popularity: Dict[str, float], neighbors: Dict[str, List[Tuple[str, float]]], recommendation_generation: int = 0, catalog_version: int = 0):
+        self.products = products
+        self.products_by_id = {p.id: p for p in products}
+        self.weights = weights
+        self.popularity = popularity
+        self.neighbors = {
+            pid: [(nid, score) for nid, score in items if nid in self.products_by_id]
+            for pid, items in neighbors.items()
+        }
+        self.recommendation_generation = recommendation_generation
+        self.catalog_version = catalog_version
+        self.created_at = time.monotonic()
+        self._index: Optional[CatalogIndex] = None
+
+    @property
+    def index(self) -> CatalogIndex:
+        # строится при первом обращении (только для SCORING_ENGINE = "numpy")
+        if self._index is None:
+            self._index = CatalogIndex(self.products, self.popularity, self.neighbors)
+        return self._index
+
+    def similar_products(self, product_id: str, limit: int) -> List[Product]:
+        return [self.products_by_id[nid] for nid, _ in self.neighbors.get(product_id, [])[:limit]]
+
+    def is_expired(self, ttl: float) -> bool:
+        return time.monotonic() - self.created_at > ttl
+
+class CatalogCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.is_expired(self.ttl):
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.is_expired(self.ttl):
+                    snapshot = self._build()
+                    self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _build(self) -> CatalogSnapshot:
+        db = SessionLocal()
+        try:
+            products = ProductRepository(db).get_all()
+            counts = PopularityRepository(db).get_counts()
+            neighbors = NeighborRepository(db).get_neighbors_map()
+            generation = RecommendationListRepository(db).get_generation()
+            version = CatalogVersionRepository(db).get()
+            weights = dict(DEFAULT_WEIGHTS)
+            config = db.query(AppConfig).filter(AppConfig.key == "algo_weights").first()
+            if config and config.value:
+                weights.update(config.value)
+            db.expunge_all()
+        finally:
+            db.close()
+        return CatalogSnapshot(products, weights, compute_global_popularity(products, counts, weights), neighbors, generation, version[0] if version else 0)
+
+catalog_cache = CatalogCache(ttl=settings.CATALOG_CACHE_TTL)
@@ -0,0 +1,146 @@
+import csv
+import json
+import math
+import uuid
+import random
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import insert, select
+from backend.config import settings
+from backend.database import engine
+from backend.models import Product
+from backend.exports import stream_csv
+
+# Столбцы файла импорта/экспорта (id при импорте игнорируется - товары всегда создаются новыми)
+EXPORT_FIELDS = ("id", "sku", "name", "category", "price", "description", "image_url")
+REQUIRED_FIELDS = ("name", "category", "price")
+FORMATS = ("csv", "jsonl")
+
+class CatalogFormatError(ValueError):
+    """
+    Файл целиком не читается как каталог (нет заголовка, обязательных столбцов и т.п.).
+    """
+
+def detect_format(filename: str, default: str = "csv") -> str:
+    ext = (filename or "").rsplit(".", 1)[-1].lower()
+    return {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl"}.get(ext, default)
+
+def parse_csv(lines: Iterable[str]) -> Iterator[Tuple[int, Dict]]:
+    """
+    (номер строки файла, словарь по заголовку) - построчно, без чтения файла целиком.
+    """
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        raise CatalogFormatError("Empty file")
+    missing = [f for f in REQUIRED_FIELDS if f not in reader.fieldnames]
+    if missing:
+        raise CatalogFormatError(f"Missing columns: {', '.join(missing)}")
+    try:
+        for row in reader:
+            yield reader.line_num, row
+    except csv.Error as e:
+        raise CatalogFormatError(f"line {reader.line_num}: {e}")
+
+def parse_jsonl(lines: Iterable[str]) -> Iterator[Tuple[int, Dict]]:
+    for line_num, line in enumerate(lines, 1):
+        if not line.strip(): continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_num, {"__error__": f"invalid JSON: {e}"}
+            continue
+        yield line_num, row if isinstance(row, dict) else {"__error__": "expected a JSON object"}
+
+PARSERS = {"csv": parse_csv, "jsonl": parse_jsonl}
+
+def validate(row: Dict, manager_id: Optional[str]) -> Dict:
+    """
+    Строка файла -> значения для INSERT в products. Ошибка - ValueError с понятным текстом.
+    """
+    if "__error__" in row:
+        raise ValueError(row["__error__"])
+    name = str(row.get("name") or "").strip()
+    category = str(row.get("category") or "").strip()
+    if not name: raise ValueError("name is required")
+    if not category: raise ValueError("category is required")
+    try:
+        price = float(str(row.get("price")).strip().replace(",", "."))
+    except ValueError:
+        raise ValueError(f"invalid price: {row.get('price')!r}")
+    if price < 0 or not math.isfinite(price): raise ValueError(f"invalid price: {row.get('price')!r}")
+    return {
+        "id": str(uuid.uuid4()),
+        "manager_id": manager_id,
+        "name": name,
+        "category": category,
+        "price": round(price, 2),
+        "description": str(row.get("description") or "").strip(),
+        "sku": str(row.get("sku") or "").strip() or f"SKU-{random.randint(1000, 9999)}",
+        "image_url": str(row.get("image_url") or "").strip(),
+    }
+
+class ImportResult:
+    MAX_ERRORS = 100
+
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Tuple[int, str]] = []
+        # ошибка, прервавшая разбор файла; пачки до неё уже сохранены
+        self.error: Optional[str] = None
+
+    def add_error(self, line_num: int, message: str):
+        self.failed += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append((line_num, message))
+
+class ProductImporter:
+    """
+    Потоковый импорт товаров: строки разбираются генератором, проверяются и вставляются
+    пачками по chunk_size одним executemany; каждая пачка - своя транзакция,
+    поэтому память ограничена размером пачки, а ошибка в файле не откатывает уже вставленное.
+    FTS-индекс и версию каталога обновляют триггеры на products.
+    """
+    def __init__(self, manager_id: Optional[str], chunk_size: int = settings.IMPORT_CHUNK_SIZE):
+        self.manager_id = manager_id
+        self.chunk_size = chunk_size
+
+    def run(self, lines: Iterable[str], fmt: str = "csv") -> ImportResult:
+        result = ImportResult()
+        rows = self._valid_rows(PARSERS[fmt](lines), result)
+        try:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk: break
+                with engine.begin() as conn:
+                    conn.execute(insert(Product), chunk)
+                result.inserted += len(chunk)
+        except CatalogFormatError as e:
+            result.error = str(e)
+        except UnicodeDecodeError:
+            result.error = "File is not valid UTF-8"
+        return result
+
+    def _valid_rows(self, parsed: Iterator[Tuple[int, Dict]], result: ImportResult) -> Iterator[Dict]:
+        for line_num, row in parsed:
+            try:
+                yield validate(row, self.manager_id)
+            except ValueError as e:
+                result.add_error(line_num, str(e))
+
+def export_products(manager_id: Optional[str], fmt: str = "csv", batch_size: int = settings.IMPORT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Товары менеджера (manager_id=None - весь каталог) порциями текста для StreamingResponse.
+    Соединение открывается внутри генератора и живёт, пока ответ отдаётся.
+    """
+    columns = [getattr(Product, f) for f in EXPORT_FIELDS]
+    query = select(*columns).order_by(Product.name, Product.id)
+    if manager_id is not None:
+        query = query.where(Product.manager_id == manager_id)
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(query)
+        if fmt == "csv":
+            yield from stream_csv(EXPORT_FIELDS, result.partitions())
+        else:
+            for rows in result.partitions():
+                yield "".join(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n" for row in rows)
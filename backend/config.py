@@ -7,10 +7,110 @@ class Settings:
     BASE_DIR = Path(__file__).resolve().parent
     ROOT_DIR = BASE_DIR.parent
     
-    DATABASE_URL: str = f"sqlite:///{ROOT_DIR / 'recsys.db'}"
+    DATABASE_URL: str = os.getenv("DATABASE_URL", f"sqlite:///{ROOT_DIR / 'recsys.db'}")
+
+    # Профиль хранилища SQLite: PRAGMA, применяемые к каждому новому соединению
+    DB_PROFILE: str = os.getenv("DB_PROFILE", "production")
+    SQLITE_PROFILES = {
+        "default": {},
+        "production": {
+            "journal_mode": "WAL",       # читатели не блокируются записью
+            "synchronous": "NORMAL",     # в WAL fsync только на checkpoint
+            "cache_size": -64000,        # 64 МБ страничного кэша на соединение
+            "mmap_size": 268435456,      # 256 МБ memory-mapped I/O
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000,        # мс ожидания блокировки вместо "database is locked"
+        },
+    }
+
+    # Пул соединений SQLAlchemy
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+
+    # Потоки для синхронных обработчиков; не больше числа соединений пула
+    DB_THREADPOOL_SIZE: int = DB_POOL_SIZE + DB_MAX_OVERFLOW
+
+    # Модель похожих товаров: соседей на товар и товаров на клиента при расчёте
+    SIMILARITY_TOP_N: int = 20
+    SIMILARITY_MAX_ITEMS_PER_CLIENT: int = 200
+
+    # Выдача рекомендаций: "live" - расчёт на каждый запрос, "precomputed" - списки из
+    # precompute_recommendations.py с откатом на live-расчёт для новых и устаревших клиентов
+    RECOMMENDATION_MODE: str = os.getenv("RECOMMENDATION_MODE", "live")
+    PRECOMPUTED_TOP_N: int = 50
+
+    # Признаки клиента: период полураспада весов в днях (0 - без затухания), товаров в профиле
+    CLIENT_FEATURE_HALF_LIFE_DAYS: float = 0
+    CLIENT_FEATURE_MAX_ITEMS: int = 200
+
+    # Подпись cookie сессии (без SECRET_KEY - случайный ключ процесса, см. backend/auth.py),
+    # срок жизни сессии в сек. и кэш пользователей (размер, время жизни записи в сек.)
+    SECRET_KEY: str = os.getenv("SECRET_KEY", "")
+    SESSION_MAX_AGE: int = 7 * 24 * 3600
+    SESSION_CACHE_SIZE: int = 1024
+    SESSION_CACHE_TTL: int = 300
+
+    # Буферизация событий Interaction: запись пачкой по размеру или по таймеру (сек.)
+    INTERACTION_BATCH_SIZE: int = 500
+    INTERACTION_FLUSH_INTERVAL: float = 1.0
+    # Повторы неудачной записи пачки и предел очереди событий в памяти
+    INTERACTION_FLUSH_RETRIES: int = 3
+    INTERACTION_MAX_PENDING: int = 50000
 
     TEMPLATE_DIR = ROOT_DIR / "frontend" / "templates"
+    # Проверять изменение файлов шаблонов на каждом рендеринге - только для разработки (run.py включает TEMPLATE_AUTO_RELOAD=1)
+    TEMPLATE_AUTO_RELOAD: bool = os.getenv("TEMPLATE_AUTO_RELOAD", "0") == "1"
+    # Кэш HTML карточек товаров (число карточек)
+    CARD_CACHE_SIZE: int = 10000
+    # HTTP-кэширование: /static/...?v=<хэш содержимого> кэшируется браузером на год, ответы сжимаются gzip
+    STATIC_MAX_AGE: int = 365 * 24 * 3600
+    GZIP_MIN_SIZE: int = 1000
+    GZIP_LEVEL: int = 6
     STATIC_DIR = ROOT_DIR / "frontend" / "static"
 
+    # Время жизни снимка каталога для рекомендаций (сек.)
+    CATALOG_CACHE_TTL: int = 60
+
+    # Метрики: /metrics в формате Prometheus и, при SERVER_TIMING=1, заголовок Server-Timing
+    # с разбивкой времени запроса (sql, score, render)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "1") == "1"
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING", "0") == "1"
+
+    # Постраничный вывод списков (категория, товары менеджера, отчёты, заказы): размер по умолчанию и предел ?limit=
+    PAGE_SIZE: int = 24
+    MAX_PAGE_SIZE: int = 100
+
+    # Поиск (FTS5): размер страницы; первые SEARCH_RERANK_WINDOW совпадений переупорядочиваются
+    # с долей SEARCH_PERSONALIZATION_WEIGHT оценки рекомендаций (0 - только релевантность)
+    SEARCH_PAGE_SIZE: int = 24
+    SEARCH_RERANK_WINDOW: int = 100
+    SEARCH_PERSONALIZATION_WEIGHT: float = 0.3
+
+    # Профилирование запросов: включается здесь или модулем "Profiler" в админ-панели.
+    # Доля запросов под cProfile; для остальных - выборка стеков раз в PROFILING_SAMPLE_INTERVAL сек.,
+    # отчёт сохраняется, если запрос дольше PROFILING_SLOW_THRESHOLD сек. (0 - только доля)
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "0") == "1"
+    PROFILING_SAMPLE_RATE: float = 0.01
+    PROFILING_SLOW_THRESHOLD: float = 1.0
+    PROFILING_SAMPLE_INTERVAL: float = 0.005
+    PROFILING_TOGGLE_TTL: int = 10
+    PROFILING_MAX_FILES: int = 50
+    PROFILE_DIR = ROOT_DIR / "profiles"
+
+    # Импорт/экспорт каталога: строк на один executemany (и одну транзакцию)
+    IMPORT_CHUNK_SIZE: int = 5000
+    # Выгрузки отчётов и продаж: строк, читаемых курсором за раз
+    EXPORT_BATCH_SIZE: int = 2000
+
+    # JSON API рекомендаций: токен для сервисов (заголовок "Authorization: Bearer <токен>"), ограничения запроса
+    API_TOKEN: str = os.getenv("RECSYS_API_TOKEN", "")
+    API_DEFAULT_LIMIT: int = 10
+    API_MAX_LIMIT: int = 100
+    API_MAX_BATCH: int = 500
+
+    # Движок скоринга рекомендаций: "python" (словари) или "numpy" (векторный, backend/vectorized.py)
+    SCORING_ENGINE: str = os.getenv("SCORING_ENGINE", "python")
+
 
 settings = Settings()
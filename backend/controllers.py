@@ -1,22 +1,57 @@
-from fastapi import APIRouter, Request, Depends, Form, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Request, Depends, Form, HTTPException, File, Query, UploadFile
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.attributes import flag_modified
 
 from backend.database import get_db
-from backend.repositories import UserRepository, ProductRepository, ReportRepository
+from typing import Optional
+from backend.repositories import UserRepository, ProductRepository, ReportRepository, OrderRepository
 from backend.services import RecommendationService, CartService, ManagerService
-from backend.models import Client, Manager, Admin, Profile, UserRole, Interaction, ActionType, SystemModule, CartItem, Product, Report
-import backend.models
+from backend.models import Client, Manager, Admin, Profile, UserRole, ActionType, SystemModule, CartItem, Product, Report
 import random
 from backend.config import settings
-from datetime import datetime 
+from datetime import datetime, timedelta
 from backend.models import AppConfig
+from backend.strategies import DEFAULT_WEIGHTS, ProductFilter
+from backend.cache import catalog_cache
+from backend.ingestion import interaction_writer
+from backend.auth import SESSION_COOKIE, set_session_cookie, verify_session_token, password_stamp, identity_cache, UserIdentity
+from backend.metrics import InstrumentedTemplates
+from backend.rendering import ProductCardCache
+from backend.http_cache import PageValidators, asset_versions
+from backend.catalog_io import ProductImporter, FORMATS, detect_format, export_products
+from backend.exports import SALES_SOURCES, report_csv, sales_csv
+from backend.profiling import ProfiledRoute, PROFILER_MODULE, profiler, profile_store
+import io
+import hmac
 import json
-
-templates = Jinja2Templates(directory=str(settings.TEMPLATE_DIR))
-router = APIRouter()
+import math
+
+templates = InstrumentedTemplates(directory=str(settings.TEMPLATE_DIR))
+templates.env.auto_reload = settings.TEMPLATE_AUTO_RELOAD
+# сетки товаров собираются из закэшированных карточек: {{ product_cards(products) }}
+product_cards = ProductCardCache(templates.env, settings.CARD_CACHE_SIZE)
+templates.env.globals["product_cards"] = product_cards.render
+templates.env.globals["static_url"] = asset_versions.url
+# Маршруты, работающие с БД, объявлены обычными def: FastAPI выполняет их в пуле потоков
+# (размер - settings.DB_THREADPOOL_SIZE), и синхронные запросы SQLAlchemy не блокируют event loop.
+router = APIRouter(route_class=ProfiledRoute)
+
+def _download(chunks, filename: str, media_type: str = "text/csv; charset=utf-8") -> StreamingResponse:
+    # генератор отдаётся по мере формирования: документ целиком в памяти не собирается
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+def _parse_period(date_from: str, date_to: str):
+    # даты из <input type="date">, конец периода включительно
+    start = datetime.strptime(date_from, "%Y-%m-%d") if date_from else None
+    end = datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1) if date_to else None
+    return start, end
+
+def _parse_price_range(min_price: str, max_price: str) -> ProductFilter:
+    # цены из <input type="number">; пустое поле - без ограничения
+    bounds = [float(value) if value.strip() else None for value in (min_price, max_price)]
+    if any(bound is not None and not math.isfinite(bound) for bound in bounds): raise ValueError("price must be finite")
+    return ProductFilter(min_price=bounds[0], max_price=bounds[1])
 
 class BaseController:
     def __init__(self, db: Session):
@@ -24,17 +59,40 @@ class BaseController:
         self.user_repo = UserRepository(db)
 
     def get_current_user(self, request: Request):
-        user_id = request.cookies.get("user_id")
-        if not user_id: return None
-        return self.user_repo.get_by_id(user_id)
+        """
+        Пользователь из подписанной cookie сессии (UserIdentity из кэша, без запроса к БД при попадании).
+        """
+        session = verify_session_token(request.cookies.get(SESSION_COOKIE))
+        if not session: return None
+        user_id, role, stamp = session
+        identity = identity_cache.get(user_id)
+        if identity is not None and hmac.compare_digest(identity.password_stamp, stamp):
+            return identity
+        # промах или устаревший отпечаток: пароль могли сменить в другом процессе - сверяемся с БД
+        identity_cache.invalidate(user_id)
+        user = self.user_repo.get_by_id_and_role(user_id, role)
+        if not user: return None
+        identity = identity_cache.put(UserIdentity(user))
+        return identity if hmac.compare_digest(identity.password_stamp, stamp) else None
+
+    def load_current_user(self, request: Request):
+        """
+        ORM-сущность текущего пользователя - для маршрутов, которые его изменяют.
+        """
+        session = verify_session_token(request.cookies.get(SESSION_COOKIE))
+        if not session: return None
+        user_id, role, stamp = session
+        user = self.user_repo.get_by_id_and_role(user_id, role)
+        if not user or not hmac.compare_digest(password_stamp(user.password_hash), stamp): return None
+        return user
 
 class AuthController(BaseController):
-    async def login(self, request: Request, username: str, password: str):
+    def login(self, request: Request, username: str, password: str):
         user = self.user_repo.get_by_username(username)
         if user and user.password_hash == password:
             url = "/client/home" if user.role == UserRole.CLIENT else "/manager/cabinet" if user.role == UserRole.MANAGER else "/admin/panel"
             resp = RedirectResponse(url, status_code=303)
-            resp.set_cookie(key="user_id", value=user.id)
+            set_session_cookie(resp, user)
             return resp
         return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid login or password"})
 
@@ -45,20 +103,20 @@ async def root(): return RedirectResponse("/login")
 async def login_page(request: Request): return templates.TemplateResponse("login.html", {"request": request, "hide_header": True})
 
 @router.post("/login")
-async def login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
-    return await AuthController(db).login(request, username, password)
+def login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
+    return AuthController(db).login(request, username, password)
 
 @router.get("/logout")
 async def logout():
     resp = RedirectResponse("/login", status_code=303)
-    resp.delete_cookie("user_id")
+    resp.delete_cookie(SESSION_COOKIE)
     return resp
 
 @router.get("/register", response_class=HTMLResponse)
 async def reg_page(request: Request): return templates.TemplateResponse("register.html", {"request": request, "hide_header": True})
 
 @router.post("/register")
-async def register(request: Request, username: str = Form(...), password: str = Form(...), full_name: str = Form(...), gender: str = Form(...), interests: list = Form([]), db: Session = Depends(get_db)):
+def register(request: Request, username: str = Form(...), password: str = Form(...), full_name: str = Form(...), gender: str = Form(...), interests: list = Form([]), db: Session = Depends(get_db)):
     if UserRepository(db).get_by_username(username):
         return templates.TemplateResponse("register.html", {"request": request, "hide_header": True, "error": "Email exists"})
     client = Client(username=username, password_hash=password, role=UserRole.CLIENT, full_name=full_name, gender=gender)
@@ -67,14 +125,14 @@ async def register(request: Request, username: str = Form(...), password: str =
     db.add(Profile(client_id=client.id, interests=interests))
     db.commit()
     resp = RedirectResponse("/client/home", status_code=303)
-    resp.set_cookie("user_id", client.id)
+    set_session_cookie(resp, client)
     return resp
 
 @router.get("/register/manager", response_class=HTMLResponse)
 async def reg_manager_page(request: Request): return templates.TemplateResponse("register_manager.html", {"request": request, "hide_header": True})
 
 @router.post("/register/manager")
-async def register_manager(request: Request, username: str = Form(...), password: str = Form(...), organization: str = Form(...), name: str = Form(None), gender: str = Form(None), db: Session = Depends(get_db)):
+def register_manager(request: Request, username: str = Form(...), password: str = Form(...), organization: str = Form(...), name: str = Form(None), gender: str = Form(None), db: Session = Depends(get_db)):
     mgr = Manager(
         username=username, 
         password_hash=password, 
@@ -84,45 +142,67 @@ async def register_manager(request: Request, username: str = Form(...), password
     db.add(mgr)
     db.commit()
     resp = RedirectResponse("/manager/cabinet", status_code=303)
-    resp.set_cookie("user_id", mgr.id)
+    set_session_cookie(resp, mgr)
     return resp
 
 @router.get("/client/home", response_class=HTMLResponse)
-async def client_home(request: Request, search: str = "", db: Session = Depends(get_db)):
+def client_home(request: Request, search: str = "", page: int = 1, min_price: str = "", max_price: str = "", db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     if not user: return RedirectResponse("/login")
-    products = RecommendationService(db).get_recommendations(user, limit=50)
-    if search:
-        search = search.lower()
-        products = [p for p in products if search in p.name.lower()]
-    return templates.TemplateResponse("client/home.html", {"request": request, "user": user, "products": products})
+    if search.strip():
+        products, total = RecommendationService(db).search(user, search, page)
+        pages = max(1, -(-total // settings.SEARCH_PAGE_SIZE))
+        return templates.TemplateResponse("client/home.html", {
+            "request": request, "user": user, "products": products,
+            "search": search, "total": total, "page": page, "pages": pages
+        })
+    try:
+        filters = _parse_price_range(min_price, max_price)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Prices must be numbers")
+    # диапазон цен отбирает товары до ранжирования, поэтому в выдачу попадает весь подходящий каталог
+    products = RecommendationService(db).get_recommendations(user, limit=50, filters=filters or None)
+    return templates.TemplateResponse("client/home.html", {
+        "request": request, "user": user, "products": products, "min_price": min_price, "max_price": max_price
+    })
 
 @router.get("/client/category/{cat}", response_class=HTMLResponse)
-async def cat_products(request: Request, cat: str, db: Session = Depends(get_db)):
+def cat_products(request: Request, cat: str, after: Optional[str] = None, before: Optional[str] = None, limit: int = settings.PAGE_SIZE, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     if not user: return RedirectResponse("/login")
-    products = db.query(Product).filter(Product.category == cat).all()
-    return templates.TemplateResponse("client/category_products.html", {"request": request, "user": user, "products": products, "category_name": cat})
+    validators = PageValidators.for_catalog(db, request, user)
+    if validators.is_fresh(request): return validators.not_modified()
+    page = ProductRepository(db).page_by_category(cat, after, before, limit)
+    return validators.apply(templates.TemplateResponse("client/category_products.html", {
+        "request": request, "user": user, "products": page.items, "page": page, "page_url": request.url.path, "category_name": cat
+    }))
 
 @router.get("/client/product/{pid}", response_class=HTMLResponse)
-async def product_detail(request: Request, pid: str, db: Session = Depends(get_db)):
+def product_detail(request: Request, pid: str, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     if not user: return RedirectResponse("/login")
+    # похожие товары берутся из среза каталога, который может отставать от БД на CATALOG_CACHE_TTL
+    snapshot = catalog_cache.get()
+    validators = PageValidators.for_catalog(db, request, user, snapshot.catalog_version)
+    if validators.is_fresh(request):
+        # страница не изменилась, но просмотр всё равно учитывается
+        interaction_writer.record(user.id, pid, ActionType.VIEW)
+        return validators.not_modified()
     product = ProductRepository(db).get_by_id(pid)
     if not product: raise HTTPException(status_code=404)
-    db.add(Interaction(client_id=user.id, product_id=pid, type=ActionType.VIEW))
-    db.commit()
-    similar = db.query(Product).filter(Product.category == product.category, Product.id != product.id).limit(4).all()
-    return templates.TemplateResponse("client/product.html", {"request": request, "user": user, "product": product, "similar": similar})
+    interaction_writer.record(user.id, pid, ActionType.VIEW)
+    similar = snapshot.similar_products(pid, 4)
+    if not similar:
+        similar = db.query(Product).filter(Product.category == product.category, Product.id != product.id).limit(4).all()
+    return validators.apply(templates.TemplateResponse("client/product.html", {"request": request, "user": user, "product": product, "similar": similar}))
 
 @router.post("/client/cart/add/{pid}")
-async def add_to_cart(request: Request, pid: str, db: Session = Depends(get_db)):
+def add_to_cart(request: Request, pid: str, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     if not user: return RedirectResponse("/login")
     
     CartService(db).add_to_cart(user.id, pid)
-    db.add(Interaction(client_id=user.id, product_id=pid, type=ActionType.ADD_TO_CART))
-    db.commit()
+    interaction_writer.record(user.id, pid, ActionType.ADD_TO_CART)
     
     referer = request.headers.get("referer", "/client/home")
     if "#" in referer: referer = referer.split("#")[0]
@@ -131,7 +211,7 @@ async def add_to_cart(request: Request, pid: str, db: Session = Depends(get_db))
     return RedirectResponse(redirect_url, status_code=303)
 
 @router.post("/client/cart/update/{item_id}")
-async def update_cart_item(request: Request, item_id: int, action: str = Form(...), db: Session = Depends(get_db)):
+def update_cart_item(request: Request, item_id: int, action: str = Form(...), db: Session = Depends(get_db)):
     item = db.query(CartItem).filter(CartItem.id == item_id).first()
     if item:
         if action == "increase": item.quantity += 1
@@ -142,7 +222,7 @@ async def update_cart_item(request: Request, item_id: int, action: str = Form(..
     return RedirectResponse("/client/cart", status_code=303)
 
 @router.get("/client/cart", response_class=HTMLResponse)
-async def view_cart(request: Request, db: Session = Depends(get_db)):
+def view_cart(request: Request, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     if not user: return RedirectResponse("/login")
     cart = CartService(db).cart_repo.get_by_client(user.id)
@@ -153,7 +233,7 @@ async def view_cart(request: Request, db: Session = Depends(get_db)):
     return templates.TemplateResponse("client/cart.html", {"request": request, "user": user, "items": items, "subtotal": round(subtotal,2), "delivery": delivery, "total": round(total,2)})
 
 @router.get("/client/payment", response_class=HTMLResponse)
-async def payment_page(request: Request, db: Session = Depends(get_db)):
+def payment_page(request: Request, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     cart = CartService(db).cart_repo.get_by_client(user.id)
     if not cart or not cart.items: return RedirectResponse("/client/home")
@@ -163,20 +243,20 @@ async def payment_page(request: Request, db: Session = Depends(get_db)):
     return templates.TemplateResponse("client/payment.html", {"request": request, "user": user, "subtotal": round(subtotal,2), "delivery": delivery, "total": round(total,2)})
 
 @router.post("/client/checkout")
-async def checkout(request: Request, db: Session = Depends(get_db)):
+def checkout(request: Request, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     CartService(db).checkout(user.id)
     return templates.TemplateResponse("client/result.html", {"request": request, "user": user})
 
 @router.get("/client/profile", response_class=HTMLResponse)
-async def profile(request: Request, db: Session = Depends(get_db)):
-    user = BaseController(db).get_current_user(request)
+def profile(request: Request, db: Session = Depends(get_db)):
+    user = BaseController(db).load_current_user(request)
     if not user: return RedirectResponse("/login")
     return templates.TemplateResponse("client/profile.html", {"request": request, "user": user})
 
 @router.post("/client/profile/update")
-async def update_profile(request: Request, full_name: str = Form(...), gender: str = Form(...), interests: list = Form([]), password: str = Form(...), db: Session = Depends(get_db)):
-    user = BaseController(db).get_current_user(request)
+def update_profile(request: Request, full_name: str = Form(...), gender: str = Form(...), interests: list = Form([]), password: str = Form(...), db: Session = Depends(get_db)):
+    user = BaseController(db).load_current_user(request)
     if not user: return RedirectResponse("/login")
     user.full_name = full_name
     user.gender = gender
@@ -187,58 +267,43 @@ async def update_profile(request: Request, full_name: str = Form(...), gender: s
     else:
         db.add(Profile(client_id=user.id, interests=interests))
     db.commit()
-    return RedirectResponse("/client/profile", status_code=303)
+    identity_cache.invalidate(user.id)
+    # старые сессии с прежним паролем больше не действуют - текущей выдаём новую
+    resp = RedirectResponse("/client/profile", status_code=303)
+    set_session_cookie(resp, user)
+    return resp
 
 @router.get("/client/orders", response_class=HTMLResponse)
-async def orders(request: Request, db: Session = Depends(get_db)):
+def orders(request: Request, after: Optional[str] = None, before: Optional[str] = None, limit: int = settings.PAGE_SIZE, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     if not user: return RedirectResponse("/login")
     
-    user_orders = db.query(backend.models.Order).filter(backend.models.Order.client_id == user.id).order_by(backend.models.Order.created_at.desc()).all()
-    
-    TIME_STEP = 5
-    
-    current_time = datetime.utcnow()
-    
-    for order in user_orders:
-        if order.status == backend.models.OrderStatus.CANCELLED:
-            continue
-            
-        delta = (current_time - order.created_at).total_seconds()
-                
-        if delta < TIME_STEP:
-            new_status = backend.models.OrderStatus.PROCESSING
-        elif delta < (TIME_STEP * 2):
-            new_status = backend.models.OrderStatus.SHIPPING
-        else:
-            new_status = backend.models.OrderStatus.COMPLETED
-
-        if order.status != new_status:
-            order.status = new_status
-            db.commit()
-
-    return templates.TemplateResponse("client/orders.html", {"request": request, "user": user, "orders": user_orders})
+    page = OrderRepository(db).page_by_client(user.id, after, before, limit)
+    # статус выводится из времени оформления при рендеринге (Order.current_status), страница ничего не пишет
+    return templates.TemplateResponse("client/orders.html", {
+        "request": request, "user": user, "orders": page.items, "page": page, "page_url": request.url.path, "now": datetime.utcnow()
+    })
 
 @router.get("/manager/cabinet")
-async def mgr_cab(request: Request, db: Session = Depends(get_db)):
+def mgr_cab(request: Request, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     if not user: return RedirectResponse("/login")
     return templates.TemplateResponse("manager/cabinet.html", {"request": request, "user": user})
 
 @router.get("/manager/products")
-async def mgr_products(request: Request, db: Session = Depends(get_db)):
+def mgr_products(request: Request, after: Optional[str] = None, before: Optional[str] = None, limit: int = settings.PAGE_SIZE, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     if not user: return RedirectResponse("/login")
-    products = db.query(Product).filter(Product.manager_id == user.id).all()
-    return templates.TemplateResponse("manager/products_list.html", {"request": request, "products": products, "user": user})
+    page = ProductRepository(db).page_by_manager(user.id, after, before, limit)
+    return templates.TemplateResponse("manager/products_list.html", {"request": request, "products": page.items, "page": page, "page_url": request.url.path, "user": user})
 
 @router.get("/manager/products/add", response_class=HTMLResponse)
-async def add_product_page(request: Request, db: Session = Depends(get_db)):
+def add_product_page(request: Request, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     return templates.TemplateResponse("manager/product_form.html", {"request": request, "user": user, "product": None})
 
 @router.post("/manager/products/add")
-async def add_product(
+def add_product(
     request: Request, 
     name: str = Form(...), category: str = Form(...), price: float = Form(...), 
     description: str = Form(...), image_url: str = Form(...),
@@ -251,17 +316,37 @@ async def add_product(
     )
     db.add(new_product)
     db.commit()
+    catalog_cache.invalidate()
     return RedirectResponse("/manager/products", status_code=303)
 
+@router.post("/manager/products/import", response_class=HTMLResponse)
+def import_products(request: Request, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    user = BaseController(db).get_current_user(request)
+    if not user: return RedirectResponse("/login")
+    # файл загрузки уже во временном файле; читаем его построчно, не целиком
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    result = ProductImporter(user.id).run(lines, detect_format(file.filename))
+    if result.inserted:
+        catalog_cache.invalidate()
+    return templates.TemplateResponse("manager/import_result.html", {"request": request, "user": user, "result": result, "filename": file.filename})
+
+@router.get("/manager/products/export")
+def export_products_file(request: Request, fmt: str = Query("csv", alias="format"), db: Session = Depends(get_db)):
+    user = BaseController(db).get_current_user(request)
+    if not user: return RedirectResponse("/login")
+    if fmt not in FORMATS: fmt = "csv"
+    media_type = "text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson; charset=utf-8"
+    return _download(export_products(user.id, fmt), f"products.{fmt}", media_type)
+
 @router.get("/manager/products/edit/{pid}", response_class=HTMLResponse)
-async def edit_product_page(request: Request, pid: str, db: Session = Depends(get_db)):
+def edit_product_page(request: Request, pid: str, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     product = db.query(Product).filter(Product.id == pid, Product.manager_id == user.id).first()
     if not product: return RedirectResponse("/manager/products")
     return templates.TemplateResponse("manager/product_form.html", {"request": request, "user": user, "product": product})
 
 @router.post("/manager/products/edit/{pid}")
-async def edit_product(
+def edit_product(
     request: Request, pid: str,
     name: str = Form(...), category: str = Form(...), price: float = Form(...), 
     description: str = Form(...), image_url: str = Form(...),
@@ -276,38 +361,65 @@ async def edit_product(
         product.description = description
         product.image_url = image_url
         db.commit()
+        catalog_cache.invalidate()
+        product_cards.invalidate(pid)
     return RedirectResponse("/manager/products", status_code=303)
 
 @router.post("/manager/products/delete/{pid}")
-async def delete_product(request: Request, pid: str, db: Session = Depends(get_db)):
+def delete_product(request: Request, pid: str, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     product = db.query(Product).filter(Product.id == pid, Product.manager_id == user.id).first()
     if product:
         db.delete(product)
         db.commit()
+        catalog_cache.invalidate()
+        product_cards.invalidate(pid)
     return RedirectResponse("/manager/products", status_code=303)
 
 @router.post("/manager/reports/create")
-async def create_rep(request: Request, db: Session = Depends(get_db)):
+def create_rep(request: Request, date_from: str = Form(""), date_to: str = Form(""), db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
-    report = ManagerService(db).generate_report(user.id)
+    try:
+        start, end = _parse_period(date_from, date_to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    report = ManagerService(db).generate_report(user.id, start, end)
     return RedirectResponse(f"/manager/report/{report.id}", status_code=303)
 
 @router.get("/manager/report/{rid}")
-async def view_rep(request: Request, rid: str, db: Session = Depends(get_db)):
+def view_rep(request: Request, rid: str, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     report = db.query(Report).filter(Report.id == rid, Report.manager_id == user.id).first()
     if not report: return RedirectResponse("/manager/reports")
     return templates.TemplateResponse("manager/report_view.html", {"request": request, "report": report})
 
+@router.get("/manager/report/{rid}/export")
+def export_rep(request: Request, rid: str, db: Session = Depends(get_db)):
+    user = BaseController(db).get_current_user(request)
+    if not user: return RedirectResponse("/login")
+    report = db.query(Report).filter(Report.id == rid, Report.manager_id == user.id).first()
+    if not report: return RedirectResponse("/manager/reports")
+    return _download(report_csv(report), f"report-{report.id}.csv")
+
+@router.get("/manager/sales/export")
+def export_sales(request: Request, date_from: str = "", date_to: str = "", source: str = "interactions", db: Session = Depends(get_db)):
+    user = BaseController(db).get_current_user(request)
+    if not user: return RedirectResponse("/login")
+    try:
+        start, end = _parse_period(date_from, date_to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if source not in SALES_SOURCES: source = SALES_SOURCES[0]
+    return _download(sales_csv(user.id, source, start, end), f"sales-{source}-{date_from or 'start'}-{date_to or 'now'}.csv")
+
 @router.get("/manager/reports")
-async def list_rep(request: Request, db: Session = Depends(get_db)):
+def list_rep(request: Request, after: Optional[str] = None, before: Optional[str] = None, limit: int = settings.PAGE_SIZE, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
-    reps = db.query(Report).filter(Report.manager_id == user.id).all()
-    return templates.TemplateResponse("manager/reports_list.html", {"request": request, "reports": reps})
+    page = ReportRepository(db).page_by_manager(user.id, after, before, limit)
+    return templates.TemplateResponse("manager/reports_list.html", {"request": request, "reports": page.items, "page": page, "page_url": request.url.path})
 
 @router.post("/manager/reports/delete/{rid}")
-async def delete_rep(rid: str, db: Session = Depends(get_db)):
+def delete_rep(rid: str, db: Session = Depends(get_db)):
     report = ReportRepository(db).get_by_id(rid)
     if report:
         db.delete(report)
@@ -315,7 +427,7 @@ async def delete_rep(rid: str, db: Session = Depends(get_db)):
     return RedirectResponse("/manager/reports", status_code=303)
 
 @router.get("/admin/panel")
-async def admin_pan(request: Request, db: Session = Depends(get_db)):
+def admin_pan(request: Request, db: Session = Depends(get_db)):
     user = BaseController(db).get_current_user(request)
     if not user: return RedirectResponse("/login")
     mods = db.query(SystemModule).all()
@@ -324,22 +436,26 @@ async def admin_pan(request: Request, db: Session = Depends(get_db)):
     if config_obj:
         current_weights = json.dumps(config_obj.value, indent=4)
     else:
-        current_weights = json.dumps({
-            "view": 1.0,
-            "add_to_cart": 3.0,
-            "review": 4.0,
-            "purchase": 5.0
-        }, indent=4)
+        current_weights = json.dumps(DEFAULT_WEIGHTS, indent=4)
 
     return templates.TemplateResponse("admin/dashboard.html", {
         "request": request, 
         "user": user, 
         "modules": mods,
-        "weights_json": current_weights 
+        "weights_json": current_weights,
+        "profiles": profile_store.list() if user.role == UserRole.ADMIN else []
     })
 
+@router.get("/admin/profiles/{name}")
+def download_profile(name: str, request: Request, db: Session = Depends(get_db)):
+    user = BaseController(db).get_current_user(request)
+    if not user or user.role != UserRole.ADMIN: return RedirectResponse("/login")
+    path = profile_store.path(name)
+    if not path: raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=name)
+
 @router.post("/admin/config/update")
-async def update_config(request: Request, weights: str = Form(...), db: Session = Depends(get_db)):
+def update_config(request: Request, weights: str = Form(...), db: Session = Depends(get_db)):
     try:
         new_data = json.loads(weights)
         
@@ -352,16 +468,19 @@ async def update_config(request: Request, weights: str = Form(...), db: Session
             flag_modified(conf, "value")
         
         db.commit()
+        catalog_cache.invalidate()
     except Exception as e:
         print("Error saving config:", e)
     
     return RedirectResponse("/admin/panel", status_code=303)
 
 @router.post("/admin/module/toggle/{mod_id}")
-async def toggle_module(mod_id: int, db: Session = Depends(get_db)):
+def toggle_module(mod_id: int, db: Session = Depends(get_db)):
     module = db.query(SystemModule).filter(SystemModule.id == mod_id).first()
     if module:
         module.is_active = not module.is_active
         db.commit()
+        if module.name == PROFILER_MODULE:
+            profiler.set_module_state(module.is_active)
 
     return RedirectResponse("/admin/panel", status_code=303)
@@ -1,15 +1,52 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from backend.config import settings
+from backend import metrics
 
 engine = create_engine(
     settings.DATABASE_URL, 
-    connect_args={"check_same_thread": False} 
+    connect_args={"check_same_thread": False},
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT
 )
 
+@event.listens_for(engine, "connect")
+def apply_sqlite_profile(dbapi_connection, connection_record):
+    if engine.dialect.name != "sqlite": return
+    cursor = dbapi_connection.cursor()
+    for name, value in settings.SQLITE_PROFILES.get(settings.DB_PROFILE, {}).items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+if settings.METRICS_ENABLED:
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_sql_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_sql_timer(conn, cursor, statement, parameters, context, executemany):
+        metrics.observe_sql(time.perf_counter() - conn.info["query_start"].pop())
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Индексы, которые заменены более широкими: в старых файлах recsys.db они остались бы лишней нагрузкой на запись
+SUPERSEDED_INDEXES = ("ix_orders_client_id_created_at",)
+
+def ensure_indexes():
+    """
+    create_all не добавляет индексы в уже существующие таблицы,
+    поэтому для старых файлов recsys.db досоздаём недостающие и удаляем заменённые.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        for name in SUPERSEDED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
 def get_db():
     db = SessionLocal()
     try:
@@ -0,0 +1,74 @@
+import io
+import csv
+import time
+from datetime import datetime
+from typing import Iterable, Iterator, Optional, Sequence
+from backend.config import settings
+from backend.database import SessionLocal
+from backend.models import Report
+from backend.repositories import InteractionRepository, OrderRepository, ProductRepository
+
+# Размер порции текста, отдаваемой StreamingResponse за один раз
+FLUSH_BYTES = 64 * 1024
+# Накопленное отдаётся и раньше, если партии идут медленно (фильтр отбрасывает почти все строки)
+FLUSH_SECONDS = 1.0
+
+REPORT_FIELDS = ("product", "sold", "revenue")
+SALES_FIELDS = ("timestamp", "interaction_id", "client_id", "product_id", "product", "category", "price")
+ORDER_LINE_FIELDS = ("created_at", "order_id", "client_id", "product_id", "product", "quantity", "price", "amount")
+SALES_SOURCES = ("interactions", "orders")
+
+def _value(value):
+    return value.isoformat(sep=" ", timespec="seconds") if isinstance(value, datetime) else value
+
+def stream_csv(header: Sequence[str], batches: Iterable[Iterable[Sequence]]) -> Iterator[str]:
+    """
+    CSV из партий batches: заголовок отдаётся сразу, чтобы загрузка началась до первого запроса к БД,
+    строки - порциями по FLUSH_BYTES или всё накопленное раз в FLUSH_SECONDS.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    flushed_at = time.monotonic()
+    for rows in batches:
+        writer.writerows([_value(v) for v in row] for row in rows)
+        if buffer.tell() >= FLUSH_BYTES or (buffer.tell() and time.monotonic() - flushed_at >= FLUSH_SECONDS):
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            flushed_at = time.monotonic()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def report_csv(report: Report) -> Iterator[str]:
+    rows = ((row.get("product"), row.get("sold"), row.get("revenue")) for row in report.content or [])
+    return stream_csv(REPORT_FIELDS, [rows])
+
+def sales_csv(manager_id: str, source: str = "interactions", date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> Iterator[str]:
+    """
+    Выгрузка продаж менеджера за период: по событиям PURCHASE (source="interactions")
+    или по строкам заказов с количеством и ценой на момент покупки (source="orders").
+    Своя сессия БД живёт, пока ответ отдаётся; строки читаются курсором по EXPORT_BATCH_SIZE.
+    """
+    db = SessionLocal()
+    try:
+        if source == "orders":
+            product_ids = ProductRepository(db).ids_for_manager_sales(manager_id)
+            orders = OrderRepository(db).stream_in_period(date_from, date_to, settings.EXPORT_BATCH_SIZE)
+            batches = (_order_lines(rows, product_ids) for rows in orders.partitions())
+            yield from stream_csv(ORDER_LINE_FIELDS, batches)
+        else:
+            sales = InteractionRepository(db).stream_sales(manager_id, date_from, date_to, settings.EXPORT_BATCH_SIZE)
+            yield from stream_csv(SALES_FIELDS, sales.partitions())
+    finally:
+        db.close()
+
+def _order_lines(orders, product_ids: set) -> Iterator[tuple]:
+    for order_id, created_at, client_id, items in orders:
+        for item in items or []:
+            if item.get("product_id") not in product_ids: continue
+            quantity, price = item.get("quantity") or 0, item.get("price") or 0
+            yield created_at, order_id, client_id, item.get("product_id"), item.get("product_name"), quantity, price, round(quantity * price, 2)
@@ -0,0 +1,160 @@
+import os
+import hashlib
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+from fastapi import Request
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from starlette.responses import Response
+from backend.config import settings
+from backend.repositories import CatalogVersionRepository
+
+_BUMP = "UPDATE catalog_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1"
+
+# Любая запись в products (контроллеры, fill_bd.py, импорт, другой процесс) меняет версию каталога
+DDL = [
+    "INSERT OR IGNORE INTO catalog_version (id, version, updated_at) VALUES (1, 0, CURRENT_TIMESTAMP)",
+    f"CREATE TRIGGER IF NOT EXISTS products_version_ai AFTER INSERT ON products BEGIN {_BUMP}; END",
+    f"CREATE TRIGGER IF NOT EXISTS products_version_ad AFTER DELETE ON products BEGIN {_BUMP}; END",
+    f"CREATE TRIGGER IF NOT EXISTS products_version_au AFTER UPDATE ON products BEGIN {_BUMP}; END",
+]
+
+class CatalogVersionTracker:
+    """
+    Триггеры, поддерживающие CatalogVersion. Без них (не SQLite) available = False
+    и страницы каталога отдаются без условных заголовков.
+    """
+    def __init__(self):
+        self.available = False
+
+    def ensure(self, engine) -> bool:
+        if engine.dialect.name != "sqlite": return False
+        try:
+            with engine.begin() as conn:
+                for statement in DDL:
+                    conn.execute(text(statement))
+        except OperationalError as e:
+            print("Catalog version tracking is unavailable:", e)
+            self.available = False
+            return False
+        self.available = True
+        return True
+
+catalog_versions = CatalogVersionTracker()
+
+@lru_cache(maxsize=1)
+def deploy_fingerprint() -> str:
+    """
+    Хэш шаблонов и статики: после выкладки новой вёрстки старые ETag перестают совпадать.
+    Считается один раз на процесс.
+    """
+    digest = hashlib.sha1()
+    for directory in (settings.TEMPLATE_DIR, settings.STATIC_DIR):
+        for path in sorted(Path(directory).rglob("*")):
+            if path.is_file():
+                digest.update(str(path.relative_to(directory)).encode())
+                digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+class PageValidators:
+    """
+    ETag и Last-Modified HTML-страницы. Если etag = None, условные запросы не поддерживаются
+    и методы ничего не меняют. 304 отдаётся только по совпадению ETag: Last-Modified - время
+    изменения каталога с точностью до секунды, он не учитывает пользователя и выкладку.
+    """
+    def __init__(self, etag: Optional[str], last_modified: Optional[datetime]):
+        self.etag = etag
+        self.last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc) if last_modified else None
+
+    @classmethod
+    def for_catalog(cls, db: Session, request: Request, user, *parts) -> "PageValidators":
+        """
+        Валидаторы страницы каталога: версия каталога, пользователь (шапка страницы), URL с параметрами
+        и parts - прочие данные, от которых зависит страница.
+        """
+        state = CatalogVersionRepository(db).get() if catalog_versions.available else None
+        if state is None: return cls(None, None)
+        version, updated_at = state
+        key = "|".join(str(part) for part in (
+            deploy_fingerprint(), version, user.id, user.full_name, request.url.path, request.url.query, *parts
+        ))
+        # слабый ETag: тело может отличаться кодированием (gzip)
+        return cls(f'W/"{hashlib.sha1(key.encode()).hexdigest()[:24]}"', updated_at)
+
+    def is_fresh(self, request: Request) -> bool:
+        if self.etag is None: return False
+        if_none_match = request.headers.get("if-none-match")
+        if not if_none_match: return False
+        # сравнение слабое - без префикса W/; "*" не принимается: страница может оказаться 404
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return self.etag.removeprefix("W/") in tags
+
+    def not_modified(self) -> Response:
+        return self.apply(Response(status_code=304))
+
+    def apply(self, response: Response) -> Response:
+        if self.etag is None: return response
+        response.headers["ETag"] = self.etag
+        if self.last_modified:
+            response.headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        # страница персональная (шапка с именем): кэширует только браузер и каждый раз сверяет ETag
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+class AssetVersions:
+    """
+    Хэш содержимого статических файлов для адресов вида /static/style.css?v=<хэш>.
+    Хэш пересчитывается при изменении mtime файла.
+    """
+    def __init__(self, directory: Path, prefix: str = "/static"):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self._hashes: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def version(self, path: str) -> Optional[str]:
+        try:
+            mtime = os.stat(self.directory / path).st_mtime
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._hashes.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        digest = hashlib.sha256((self.directory / path).read_bytes()).hexdigest()[:16]
+        with self._lock:
+            self._hashes[path] = (mtime, digest)
+        return digest
+
+    def url(self, path: str) -> str:
+        version = self.version(path)
+        return f"{self.prefix}/{path}?v={version}" if version else f"{self.prefix}/{path}"
+
+asset_versions = AssetVersions(settings.STATIC_DIR)
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles (ETag/Last-Modified и 304 уже есть в Starlette) с Cache-Control:
+    адрес с актуальным ?v= неизменяем и кэшируется надолго, остальные - с проверкой при каждом обращении.
+    """
+    def __init__(self, *args, assets: AssetVersions, max_age: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.assets = assets
+        self.max_age = max_age
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        requested = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("v", [None])[0]
+        path = self.get_path(scope).replace(os.sep, "/")
+        if requested and requested == self.assets.version(path):
+            response.headers["Cache-Control"] = f"public, max-age={self.max_age}, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
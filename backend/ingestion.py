@@ -0,0 +1,99 @@
+import logging
+import threading
+from datetime import datetime
+from typing import List, Dict
+from backend.config import settings
+from backend.database import SessionLocal
+from backend.models import ActionType
+from backend.repositories import InteractionRepository
+
+logger = logging.getLogger(__name__)
+
+class InteractionWriter:
+    """
+    Буфер событий (VIEW / ADD_TO_CART / PURCHASE): запросы только ставят событие в очередь,
+    фоновый поток пишет пачками по достижении batch_size или раз в flush_interval секунд.
+    Неудачная пачка возвращается в очередь и повторяется до max_retries раз подряд;
+    в очереди держится не больше max_pending событий (лишние старые отбрасываются с ошибкой в логе).
+    """
+    def __init__(self, batch_size: int, flush_interval: float, max_retries: int = 3, max_pending: int = 50000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.max_pending = max_pending
+        self._failures = 0
+        self._buffer: List[Dict] = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopping = False
+        self._thread = None
+
+    def record(self, client_id: str, product_id: str, action: ActionType):
+        with self._condition:
+            self._buffer.append({"client_id": client_id, "product_id": product_id, "type": action, "timestamp": datetime.utcnow()})
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify()
+
+    def flush(self) -> bool:
+        """
+        Записывает накопленные события; False - запись не удалась и пачка оставлена для повтора.
+        """
+        with self._flush_lock:
+            with self._condition:
+                batch, self._buffer = self._buffer, []
+            if not batch: return True
+            db = SessionLocal()
+            try:
+                InteractionRepository(db).record_many(batch)
+                self._failures = 0
+                return True
+            except Exception:
+                db.rollback()
+                self._failures += 1
+                if self._failures > self.max_retries:
+                    logger.exception("Dropping %d interactions after %d failed attempts", len(batch), self._failures)
+                    self._failures = 0
+                    return False
+                logger.exception("Error flushing %d interactions (attempt %d of %d), will retry", len(batch), self._failures, self.max_retries + 1)
+                self._requeue(batch)
+                return False
+            finally:
+                db.close()
+
+    def _requeue(self, batch: List[Dict]):
+        with self._condition:
+            self._buffer = batch + self._buffer
+            overflow = len(self._buffer) - self.max_pending
+            if overflow > 0:
+                logger.error("Interaction buffer is full, dropping %d oldest events", overflow)
+                del self._buffer[:overflow]
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="interaction-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._buffer) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                stopping = self._stopping
+            if not self.flush() and not stopping:
+                # пауза перед повтором, иначе полный буфер крутит цикл без ожидания
+                with self._condition:
+                    self._condition.wait(self.flush_interval)
+            if stopping: return
+
+interaction_writer = InteractionWriter(settings.INTERACTION_BATCH_SIZE, settings.INTERACTION_FLUSH_INTERVAL,
+                                       settings.INTERACTION_FLUSH_RETRIES, settings.INTERACTION_MAX_PENDING)
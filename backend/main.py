@@ -1,17 +1,56 @@
 import uvicorn
 import random
+import anyio
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
+from starlette.middleware.gzip import GZipMiddleware
 from backend.config import settings
-from backend.database import engine, Base, SessionLocal
-from backend.controllers import router
-from backend.models import Product, Admin, Manager, UserRole, SystemModule
+from backend.database import engine, Base, SessionLocal, ensure_indexes
+from backend.search import search_index
+from backend.http_cache import catalog_versions, asset_versions, CachedStaticFiles
+from backend.controllers import router, templates
+from backend.api import router as api_router
+from backend.ingestion import interaction_writer
+from backend.metrics import MetricsMiddleware, render_metrics
+from backend.profiling import ProfilingMiddleware, PROFILER_MODULE
+from backend.models import Product, Admin, Manager, UserRole, SystemModule, Interaction, ProductPopularity, ProductNeighbor, ClientFeatures
+from backend.repositories import PopularityRepository, ClientFeatureRepository
+from backend.rendering import precompile_templates
 
 Base.metadata.create_all(bind=engine)
+ensure_indexes()
+search_index.ensure(engine)
+catalog_versions.ensure(engine)
 
 app = FastAPI()
-app.mount("/static", StaticFiles(directory=str(settings.STATIC_DIR)), name="static")
+app.mount("/static", CachedStaticFiles(directory=str(settings.STATIC_DIR), assets=asset_versions, max_age=settings.STATIC_MAX_AGE), name="static")
 app.include_router(router)
+app.include_router(api_router)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MIN_SIZE, compresslevel=settings.GZIP_LEVEL)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+async def configure_threadpool():
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.DB_THREADPOOL_SIZE
+
+@app.on_event("startup")
+def compile_templates():
+    precompile_templates(templates.env)
+
+@app.on_event("startup")
+def start_interaction_writer():
+    interaction_writer.start()
+
+@app.on_event("shutdown")
+def stop_interaction_writer():
+    interaction_writer.stop()
 
 @app.on_event("startup")
 def seed():
@@ -34,9 +73,25 @@ def seed():
             db.commit()
             print(">>> Main Manager created.")
 
+        if not db.query(ProductPopularity).first() and db.query(Interaction).first():
+            PopularityRepository(db).rebuild()
+            print(">>> Product popularity rebuilt.")
+
+        if not db.query(ClientFeatures).first() and db.query(Interaction).first():
+            ClientFeatureRepository(db).rebuild()
+            print(">>> Client features rebuilt.")
+
+        if not db.query(ProductNeighbor).first() and db.query(Interaction).first():
+            # построение O(товаров^2) - не на старте сервера; до запуска скрипта рекомендации идут без похожих товаров
+            print(">>> Similar products are not built: run build_similarity.py.")
+
         if not db.query(SystemModule).first():
             db.add(SystemModule(name="RecEngine", is_active=True))
 
+        if not db.query(SystemModule).filter(SystemModule.name == PROFILER_MODULE).first():
+            db.add(SystemModule(name=PROFILER_MODULE, is_active=False))
+            db.commit()
+
         if db.query(Product).count() == 0:
             print(">>> Seeding 60 products...")
             categories = ["Creativity", "Entertainment", "Food", "Games", "Pets", "Beauty"]
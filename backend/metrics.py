@@ -0,0 +1,164 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from fastapi.templating import Jinja2Templates
+from starlette.datastructures import MutableHeaders
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra: parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help, labelnames, buckets
+        # labels -> [счётчики по корзинам (+Inf последней), сумма, количество]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else _number(bound)
+                    le_label = f'le="{le}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le_label)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+REQUEST_DURATION = Histogram("recsys_http_request_duration_seconds", "Время обработки HTTP-запроса", ("method", "route"))
+REQUESTS_TOTAL = Counter("recsys_http_requests_total", "HTTP-запросы по маршруту и коду ответа", ("method", "route", "status"))
+REQUEST_SQL_STATEMENTS = Histogram("recsys_http_request_sql_statements", "SQL-запросов на один HTTP-запрос", ("route",), COUNT_BUCKETS)
+SQL_DURATION = Histogram("recsys_sql_duration_seconds", "Время выполнения SQL-запроса")
+PHASE_DURATION = Histogram("recsys_phase_duration_seconds", "Время этапов обработки (score - стратегии рекомендаций, render - шаблоны)", ("phase",))
+
+REGISTRY = [REQUEST_DURATION, REQUESTS_TOTAL, REQUEST_SQL_STATEMENTS, SQL_DURATION, PHASE_DURATION]
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+class RequestStats:
+    """
+    Разбивка времени одного запроса: SQL (число и время) и этапы из timer().
+    """
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.phases: Dict[str, float] = {}
+
+    def server_timing(self, total: float) -> str:
+        parts = [f'sql;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"']
+        parts += [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items()]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+# Объект статистики текущего запроса; контекст копируется в поток пула вместе с обработчиком
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("recsys_request_stats", default=None)
+
+def observe_sql(seconds: float):
+    SQL_DURATION.observe(seconds)
+    stats = _current_request.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_time += seconds
+
+@contextmanager
+def timer(phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        PHASE_DURATION.observe(elapsed, phase)
+        stats = _current_request.get()
+        if stats is not None:
+            stats.phases[phase] = stats.phases.get(phase, 0.0) + elapsed
+
+class InstrumentedTemplates(Jinja2Templates):
+    """
+    Jinja2Templates с замером рендеринга (TemplateResponse рендерит шаблон сразу).
+    """
+    def TemplateResponse(self, *args, **kwargs):
+        with timer("render"):
+            return super().TemplateResponse(*args, **kwargs)
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: гистограмма задержек по шаблону маршрута, число SQL на запрос
+    и, при server_timing=True, заголовок Server-Timing.
+    """
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    MutableHeaders(scope=message).append("Server-Timing", stats.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(token)
+            elapsed = time.perf_counter() - start
+            # шаблон маршрута ("/client/product/{pid}"), а не сам путь - иначе ряды метрик не ограничены;
+            # для смонтированных приложений (/static) - точка монтирования
+            route = scope.get("route")
+            path = getattr(route, "path", None) or scope.get("root_path") or "unmatched"
+            REQUEST_DURATION.observe(elapsed, scope["method"], path)
+            REQUESTS_TOTAL.inc(scope["method"], path, str(status))
+            REQUEST_SQL_STATEMENTS.observe(stats.sql_count, path)
@@ -1,7 +1,7 @@
 import uuid
 import enum
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, JSON, Text, Enum, Boolean
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, JSON, Text, Enum, Boolean, Index
 from sqlalchemy.orm import relationship
 from backend.database import Base
 
@@ -66,6 +66,11 @@ class Profile(Base):
 
 class Product(Base):
     __tablename__ = 'products'
+    # порядок листингов (name, id) - постраничная выборка по ключу идёт по индексу
+    __table_args__ = (
+        Index('ix_products_category_name_id', 'category', 'name', 'id'),
+        Index('ix_products_manager_id_name_id', 'manager_id', 'name', 'id'),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     manager_id = Column(String, ForeignKey('managers.id'), nullable=True)
     
@@ -80,9 +85,15 @@ class Product(Base):
     interactions = relationship("Interaction", back_populates="product", cascade="all, delete-orphan")
     cart_items = relationship("CartItem", back_populates="product", cascade="all, delete-orphan")
     feedbacks = relationship("Feedback", back_populates="product", cascade="all, delete-orphan")
+    popularity = relationship("ProductPopularity", uselist=False, back_populates="product", cascade="all, delete-orphan")
 
 class Interaction(Base):
     __tablename__ = 'interactions'
+    __table_args__ = (
+        Index('ix_interactions_client_id_timestamp', 'client_id', 'timestamp'),
+        Index('ix_interactions_product_id_type', 'product_id', 'type'),
+        Index('ix_interactions_type_timestamp', 'type', 'timestamp'),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     client_id = Column(String, ForeignKey('clients.id'))
     product_id = Column(String, ForeignKey('products.id'))
@@ -92,6 +103,104 @@ class Interaction(Base):
     client = relationship("Client", back_populates="interactions")
     product = relationship("Product", back_populates="interactions")
 
+class ProductPopularity(Base):
+    """
+    Агрегат популярности товара: счётчики действий по типам (имена колонок = ActionType.value).
+    Обновляется инкрементально при записи Interaction.
+    """
+    __tablename__ = 'product_popularity'
+    product_id = Column(String, ForeignKey('products.id'), primary_key=True)
+    view = Column(Integer, default=0, nullable=False)
+    add_to_cart = Column(Integer, default=0, nullable=False)
+    purchase = Column(Integer, default=0, nullable=False)
+    review = Column(Integer, default=0, nullable=False)
+
+    product = relationship("Product", back_populates="popularity")
+
+    def as_counts(self):
+        return {action.value: getattr(self, action.value) or 0 for action in ActionType}
+
+def decay_factor(since, until, half_life_days):
+    if not half_life_days or since is None or until is None or until <= since: return 1.0
+    return 0.5 ** ((until - since).total_seconds() / (half_life_days * 86400))
+
+class ClientFeatures(Base):
+    """
+    Признаки клиента для MLStrategy, обновляются инкрементально при записи Interaction:
+    взвешенные счётчики по категориям и товарам, купленные товары, время последней активности.
+    """
+    __tablename__ = 'client_features'
+    client_id = Column(String, ForeignKey('clients.id'), primary_key=True)
+    category_weights = Column(JSON, default=dict)
+    item_weights = Column(JSON, default=dict)
+    purchased_ids = Column(JSON, default=list)
+    last_activity = Column(DateTime)
+
+    def apply(self, events, categories, weights, half_life_days=0, max_items=200):
+        """
+        events - словари с product_id, type, timestamp (и необязательным count),
+        categories - категории товаров, weights - веса действий.
+        """
+        category_weights = dict(self.category_weights or {})
+        item_weights = dict(self.item_weights or {})
+        purchased = set(self.purchased_ids or [])
+        for event in sorted(events, key=lambda e: e["timestamp"]):
+            factor = decay_factor(self.last_activity, event["timestamp"], half_life_days)
+            if factor != 1.0:
+                category_weights = {k: v * factor for k, v in category_weights.items()}
+                item_weights = {k: v * factor for k, v in item_weights.items()}
+
+            product_id = event["product_id"]
+            weight = weights.get(event["type"], 0) * event.get("count", 1)
+            category = categories.get(product_id)
+            if category:
+                category_weights[category] = category_weights.get(category, 0.0) + weight
+            item_weights[product_id] = item_weights.get(product_id, 0.0) + weight
+            if event["type"] == ActionType.PURCHASE:
+                purchased.add(product_id)
+            if self.last_activity is None or event["timestamp"] > self.last_activity:
+                self.last_activity = event["timestamp"]
+
+        if len(item_weights) > max_items:
+            item_weights = dict(sorted(item_weights.items(), key=lambda item: item[1], reverse=True)[:max_items])
+        self.category_weights = category_weights
+        self.item_weights = item_weights
+        self.purchased_ids = sorted(purchased)
+
+    def decayed(self, now, half_life_days) -> "ClientFeatures":
+        """
+        Копия (не привязанная к сессии) с затуханием весов от last_activity до now.
+        """
+        factor = decay_factor(self.last_activity, now, half_life_days)
+        return ClientFeatures(
+            client_id=self.client_id,
+            category_weights={k: v * factor for k, v in (self.category_weights or {}).items()},
+            item_weights={k: v * factor for k, v in (self.item_weights or {}).items()},
+            purchased_ids=list(self.purchased_ids or []),
+            last_activity=self.last_activity,
+        )
+
+class ClientRecommendations(Base):
+    """
+    Предрассчитанный список рекомендаций клиента (упорядоченные id товаров) - precompute_recommendations.py.
+    generation - номер пакетного прогона; актуальный хранится в AppConfig "recommendation_generation".
+    """
+    __tablename__ = 'client_recommendations'
+    client_id = Column(String, ForeignKey('clients.id'), primary_key=True)
+    generation = Column(Integer, nullable=False)
+    product_ids = Column(JSON, default=list)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ProductNeighbor(Base):
+    """
+    Top-N похожих товаров (item-item cosine по совместным взаимодействиям клиентов).
+    Пересчитывается пакетно: build_similarity.py / backend.similarity.
+    """
+    __tablename__ = 'product_neighbors'
+    product_id = Column(String, ForeignKey('products.id'), primary_key=True)
+    neighbor_id = Column(String, ForeignKey('products.id'), primary_key=True)
+    score = Column(Float, nullable=False)
+
 class Feedback(Base):
     __tablename__ = 'feedbacks'
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -107,14 +216,14 @@ class Feedback(Base):
 class Cart(Base):
     __tablename__ = 'carts'
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    client_id = Column(String, ForeignKey('clients.id'))
+    client_id = Column(String, ForeignKey('clients.id'), index=True)
     client = relationship("Client", back_populates="cart")
     items = relationship("CartItem", back_populates="cart", cascade="all, delete-orphan")
 
 class CartItem(Base):
     __tablename__ = 'cart_items'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    cart_id = Column(String, ForeignKey('carts.id'))
+    cart_id = Column(String, ForeignKey('carts.id'), index=True)
     product_id = Column(String, ForeignKey('products.id'))
     quantity = Column(Integer, default=1)
     
@@ -123,6 +232,9 @@ class CartItem(Base):
 
 class Order(Base):
     __tablename__ = 'orders'
+    __table_args__ = (
+        Index('ix_orders_client_id_created_at_id', 'client_id', 'created_at', 'id'),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     client_id = Column(String, ForeignKey('clients.id'))
     
@@ -133,8 +245,26 @@ class Order(Base):
 
     client = relationship("Client", back_populates="orders")
 
+    # Симуляция доставки: PROCESSING -> SHIPPING -> COMPLETED, шаг в секундах
+    STATUS_STEP_SECONDS = 5
+    STATUS_FLOW = [OrderStatus.PROCESSING, OrderStatus.SHIPPING, OrderStatus.COMPLETED]
+
+    def current_status(self, now: datetime) -> OrderStatus:
+        """
+        Статус на момент now, вычисленный из created_at (чтение без записи в БД).
+        В status хранится последний явно заданный статус: PROCESSING при оформлении или CANCELLED.
+        """
+        if self.status == OrderStatus.CANCELLED or self.created_at is None:
+            return self.status
+        step = min(int((now - self.created_at).total_seconds() // self.STATUS_STEP_SECONDS), len(self.STATUS_FLOW) - 1)
+        stored = self.STATUS_FLOW.index(self.status) if self.status in self.STATUS_FLOW else 0
+        return self.STATUS_FLOW[max(step, stored, 0)]
+
 class Report(Base):
     __tablename__ = 'reports'
+    __table_args__ = (
+        Index('ix_reports_manager_id_created_at_id', 'manager_id', 'created_at', 'id'),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     manager_id = Column(String, ForeignKey('managers.id'))
     name = Column(String)
@@ -154,3 +284,13 @@ class AppConfig(Base):
     key = Column(String, unique=True, index=True)
 
     value = Column(JSON)
+
+class CatalogVersion(Base):
+    """
+    Счётчик изменений каталога (одна строка): увеличивается триггерами на products
+    и при пересчёте похожих товаров. По нему строятся ETag/Last-Modified страниц каталога.
+    """
+    __tablename__ = 'catalog_version'
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
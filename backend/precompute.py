@@ -0,0 +1,42 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import selectinload
+from backend.config import settings
+from backend.database import SessionLocal, engine
+from backend.models import Client
+from backend.repositories import RecommendationListRepository
+from backend.services import RecommendationService
+
+def _init_worker():
+    # соединения пула, унаследованные от родителя при fork, в дочернем процессе не используем
+    engine.dispose(close=False)
+
+def _compute_chunk(args: Tuple[List[str], int]) -> Dict[str, List[str]]:
+    client_ids, top_n = args
+    db = SessionLocal()
+    try:
+        service = RecommendationService(db)
+        clients = db.query(Client).filter(Client.id.in_(client_ids)).options(selectinload(Client.profile))
+        return {client.id: [p.id for p in service.compute_recommendations(client, top_n)] for client in clients}
+    finally:
+        db.close()
+
+def precompute_all(workers: Optional[int] = None, top_n: int = settings.PRECOMPUTED_TOP_N, chunk_size: int = 500) -> Tuple[int, int]:
+    """
+    Считает top_n рекомендаций для всех клиентов в пуле процессов и публикует их новым поколением.
+    Возвращает (номер поколения, число клиентов).
+    """
+    db = SessionLocal()
+    try:
+        client_ids = [cid for (cid,) in db.query(Client.id)]
+        repo = RecommendationListRepository(db)
+        generation = repo.get_generation() + 1
+        chunks = [(client_ids[i:i + chunk_size], top_n) for i in range(0, len(client_ids), chunk_size)]
+        lists = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            for result in pool.map(_compute_chunk, chunks):
+                lists.update(result)
+        repo.publish(generation, lists)
+        return generation, len(lists)
+    finally:
+        db.close()
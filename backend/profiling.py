@@ -0,0 +1,301 @@
+import io
+import os
+import re
+import sys
+import time
+import uuid
+import random
+import asyncio
+import cProfile
+import pstats
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+from backend.config import settings
+from backend.database import SessionLocal, engine
+from backend.models import SystemModule
+
+PROFILER_MODULE = "Profiler"
+
+# В процессе одновременно работает не больше одного cProfile: на Python 3.12+ профилировщик
+# (sys.monitoring) общий для всех потоков, и второй enable() падает с ValueError
+_cprofile_lock = threading.Lock()
+
+class ProfileCapture:
+    """
+    Профиль одного запроса: cProfile (mode="cprofile") или выборка стеков (mode="sampling") и список SQL.
+    Режим cprofile создаётся только после захвата _cprofile_lock и держит его до close().
+    """
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.profile = cProfile.Profile() if mode == "cprofile" else None
+        self._holds_lock = mode == "cprofile"
+        self.stacks: Counter = Counter()
+        self.sql: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def attach(self):
+        """
+        Профилирует обработчик в текущем потоке. На Python 3.12+ cProfile видит все потоки,
+        так что в отчёт может попасть и работа параллельных запросов.
+        """
+        if self.profile is not None:
+            try:
+                self.profile.enable()
+            except ValueError:
+                # профилировщик уже занят (например, coverage или внешний cProfile) - берём выборку стеков
+                self._fall_back_to_sampling()
+            else:
+                try:
+                    yield
+                finally:
+                    self.profile.disable()
+                return
+        ident = threading.get_ident()
+        sampler.register(ident, self)
+        try:
+            yield
+        finally:
+            sampler.unregister(ident)
+
+    def close(self):
+        if self._holds_lock:
+            self._holds_lock = False
+            _cprofile_lock.release()
+
+    def _fall_back_to_sampling(self):
+        self.close()
+        self.mode = "sampling"
+        self.profile = None
+
+_current_capture: ContextVar[Optional[ProfileCapture]] = ContextVar("recsys_profile_capture", default=None)
+
+def _folded_stack(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class StackSampler:
+    """
+    Фоновый поток, который раз в interval секунд снимает стеки зарегистрированных потоков.
+    Работает, пока есть кого сэмплировать.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._targets: Dict[int, ProfileCapture] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, ident: int, capture: ProfileCapture):
+        with self._lock:
+            self._targets[ident] = capture
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def unregister(self, ident: int):
+        with self._lock:
+            self._targets.pop(ident, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                targets = list(self._targets.items())
+            frames = sys._current_frames()
+            for ident, capture in targets:
+                frame = frames.get(ident)
+                if frame is not None:
+                    capture.stacks[_folded_stack(frame)] += 1
+
+sampler = StackSampler(settings.PROFILING_SAMPLE_INTERVAL)
+
+@event.listens_for(engine, "before_cursor_execute")
+def start_profiled_sql(conn, cursor, statement, parameters, context, executemany):
+    if _current_capture.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def stop_profiled_sql(conn, cursor, statement, parameters, context, executemany):
+    capture = _current_capture.get()
+    starts = conn.info.get("profile_query_start")
+    if capture is not None and starts:
+        capture.sql.append((statement, time.perf_counter() - starts.pop()))
+
+class ProfileStore:
+    """
+    Текстовые отчёты профилирования в каталоге; хранятся последние max_files.
+    """
+    NAME_PATTERN = re.compile(r"^[\w-]+\.txt$")
+
+    def __init__(self, directory: Path, max_files: int):
+        self.directory = Path(directory)
+        self.max_files = max_files
+
+    def save(self, capture: ProfileCapture, title: str) -> str:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{datetime.utcnow():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.txt"
+        with open(self.directory / name, "w", encoding="utf-8") as f:
+            f.write(title + "\n\n")
+            f.write(f"SQL: {len(capture.sql)} statements, {sum(s for _, s in capture.sql) * 1000:.1f} ms\n")
+            for statement, seconds in capture.sql:
+                f.write(f"{seconds * 1000:9.2f} ms  {' '.join(statement.split())}\n")
+            if capture.profile is not None:
+                f.write("\ncProfile (top 60 by cumulative time):\n")
+                stream = io.StringIO()
+                pstats.Stats(capture.profile, stream=stream).sort_stats("cumulative").print_stats(60)
+                f.write(stream.getvalue())
+            else:
+                f.write(f"\nStack samples every {sampler.interval * 1000:.0f} ms (folded format for flamegraph.pl / speedscope):\n")
+                for stack, count in capture.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        for old in self._files()[self.max_files:]:
+            old.unlink(missing_ok=True)
+        return name
+
+    def list(self) -> List[Dict]:
+        profiles = []
+        for path in self._files():
+            with open(path, encoding="utf-8") as f:
+                profiles.append({"name": path.name, "title": f.readline().strip()})
+        return profiles
+
+    def path(self, name: str) -> Optional[Path]:
+        if not self.NAME_PATTERN.match(name): return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+    def _files(self) -> List[Path]:
+        if not self.directory.is_dir(): return []
+        return sorted(self.directory.glob("*.txt"), reverse=True)
+
+profile_store = ProfileStore(settings.PROFILE_DIR, settings.PROFILING_MAX_FILES)
+
+class Profiler:
+    """
+    Включено ли профилирование: Settings.PROFILING_ENABLED или модуль "Profiler" в админ-панели
+    (состояние модуля перечитывается не чаще раза в PROFILING_TOGGLE_TTL сек.).
+    """
+    def __init__(self):
+        self._module_active = False
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def is_active(self) -> bool:
+        """
+        Синхронно перечитывает модуль из БД, если состояние устарело; из event loop сначала вызывается
+        refresh() в пуле потоков (ProfilingMiddleware), и здесь остаётся только чтение флага.
+        """
+        if settings.PROFILING_ENABLED: return True
+        if self.is_stale():
+            self.refresh()
+        return self._module_active
+
+    def is_stale(self) -> bool:
+        if settings.PROFILING_ENABLED: return False
+        checked_at = self._checked_at
+        return checked_at is None or time.monotonic() - checked_at > settings.PROFILING_TOGGLE_TTL
+
+    def refresh(self):
+        with self._lock:
+            if self.is_stale():
+                self.set_module_state(self._load_module_state())
+
+    def set_module_state(self, active: bool):
+        """
+        Состояние из переключателя в админ-панели; другие процессы увидят его через PROFILING_TOGGLE_TTL.
+        """
+        self._module_active = active
+        self._checked_at = time.monotonic()
+
+    def select(self) -> Optional[ProfileCapture]:
+        """
+        Режим для очередного запроса: доля PROFILING_SAMPLE_RATE - под cProfile,
+        остальные - выборка стеков (сохраняется, если запрос дольше PROFILING_SLOW_THRESHOLD).
+        """
+        if not self.is_active(): return None
+        # пока идёт другой замер cProfile, запрос получает выборку стеков
+        if random.random() < settings.PROFILING_SAMPLE_RATE and _cprofile_lock.acquire(blocking=False):
+            return ProfileCapture("cprofile")
+        if settings.PROFILING_SLOW_THRESHOLD > 0:
+            return ProfileCapture("sampling")
+        return None
+
+    def _load_module_state(self) -> bool:
+        db = SessionLocal()
+        try:
+            module = db.query(SystemModule).filter(SystemModule.name == PROFILER_MODULE).first()
+            return bool(module and module.is_active)
+        finally:
+            db.close()
+
+profiler = Profiler()
+
+def _profiled(endpoint):
+    @wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        capture = _current_capture.get()
+        if capture is None:
+            return endpoint(*args, **kwargs)
+        with capture.attach():
+            return endpoint(*args, **kwargs)
+    return wrapper
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute, который профилирует синхронный обработчик в его потоке пула,
+    если запрос выбран ProfilingMiddleware. Асинхронные обработчики не оборачиваются.
+    """
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not asyncio.iscoroutinefunction(endpoint):
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if profiler.is_stale():
+            # чтение модуля из БД - синхронный запрос, в event loop его не выполняем
+            await run_in_threadpool(profiler.refresh)
+        capture = profiler.select()
+        if capture is None:
+            return await self.app(scope, receive, send)
+        token = _current_capture.set(capture)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_capture.reset(token)
+            capture.close()
+            elapsed = time.perf_counter() - start
+            if capture.mode == "cprofile" or elapsed >= settings.PROFILING_SLOW_THRESHOLD:
+                query = scope.get("query_string", b"").decode("latin-1")
+                title = (f"{scope['method']} {scope['path']}{'?' + query if query else ''} -> {status}, "
+                         f"{elapsed * 1000:.1f} ms, {capture.mode}, {datetime.utcnow():%Y-%m-%d %H:%M:%S} UTC")
+                await run_in_threadpool(profile_store.save, capture, title)
@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, Tuple
+from jinja2 import Environment
+from markupsafe import Markup
+from backend.models import Product
+
+class ProductCardCache:
+    """
+    Кэш HTML карточек товаров для сеток каталога. Запись - по id товара вместе с версией:
+    полями, которые выводит карточка. Правка товара (в том числе из fill_bd.py или другого процесса)
+    меняет версию, и карточка перерисовывается; invalidate только освобождает память сразу.
+    """
+    TEMPLATE = "client/product_card.html"
+
+    def __init__(self, env: Environment, max_size: int):
+        self.env = env
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Tuple[tuple, Markup]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def version(p: Product) -> tuple:
+        return (p.name, p.category, p.price, p.image_url)
+
+    def render(self, products: Iterable[Product]) -> Markup:
+        return Markup("\n").join(self.render_one(p) for p in products)
+
+    def render_one(self, p: Product) -> Markup:
+        version = self.version(p)
+        with self._lock:
+            item = self._items.get(p.id)
+            if item is not None and item[0] == version:
+                self._items.move_to_end(p.id)
+                return item[1]
+        html = Markup(self.env.get_template(self.TEMPLATE).render(p=p))
+        with self._lock:
+            self._items[p.id] = (version, html)
+            self._items.move_to_end(p.id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return html
+
+    def invalidate(self, product_id: str):
+        with self._lock:
+            self._items.pop(product_id, None)
+
+def precompile_templates(env: Environment) -> int:
+    """
+    Компилирует все шаблоны заранее, чтобы первый запрос к странице не платил за разбор и компиляцию.
+    """
+    names = env.list_templates(filter_func=lambda name: name.endswith(".html"))
+    for name in names:
+        env.get_template(name)
+    return len(names)
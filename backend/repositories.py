@@ -1,10 +1,47 @@
-from sqlalchemy.orm import Session
-from typing import Type, TypeVar, List, Optional
+import json
+import base64
+from datetime import datetime
+from collections import Counter, defaultdict
+from sqlalchemy import func, or_, insert, select, text, tuple_, update, DateTime
+from sqlalchemy.orm import Session, Query, joinedload, selectinload
+from typing import Type, TypeVar, List, Optional, Dict, Tuple, Sequence
 from backend.database import Base
-from backend.models import User, Client, Product, Interaction, Report, Cart
+from backend.config import settings
+from backend.models import User, Client, Manager, Admin, UserRole, Product, Interaction, Report, Cart, Order, ProductPopularity, ProductNeighbor, ClientFeatures, ClientRecommendations, AppConfig, CatalogVersion, ActionType
+from backend.strategies import MLStrategy
+from backend.search import TABLE as SEARCH_TABLE, build_match_query
 
 T = TypeVar('T')
 
+class Page:
+    """
+    Страница постраничной выборки по ключу; курсоры - непрозрачные строки для ?after= / ?before=.
+    """
+    def __init__(self, items: List, next_cursor: Optional[str] = None, prev_cursor: Optional[str] = None, limit: int = settings.PAGE_SIZE):
+        self.items = items
+        self.limit = limit
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+def _encode_cursor(values: Sequence) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+_CURSOR_TYPES = (str, int, float, type(None))
+
+def _decode_cursor(cursor: str, columns: Sequence) -> Optional[Tuple]:
+    """
+    Значения ключа из курсора или None, если курсор повреждён: курсор приходит из URL,
+    поэтому в SQL попадают только скаляры нужного числа.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns): return None
+        if any(type(v) not in _CURSOR_TYPES for v in values): return None
+        return tuple(datetime.fromisoformat(v) if isinstance(c.type, DateTime) else v for c, v in zip(columns, values))
+    except (ValueError, TypeError):
+        return None
+
 class BaseRepository:
     def __init__(self, db: Session, model: Type[T]):
         self.db = db
@@ -16,6 +53,34 @@ class BaseRepository:
     def get_all(self) -> List[T]:
         return self.db.query(self.model).all()
 
+    def count(self) -> int:
+        return self.db.query(func.count(self.model.id)).scalar()
+
+    def paginate(self, query: Query, columns: Sequence, after: Optional[str] = None, before: Optional[str] = None,
+                 limit: int = settings.PAGE_SIZE, descending: bool = False) -> Page:
+        """
+        Keyset-пагинация: WHERE (columns) > курсор ORDER BY columns LIMIT - без OFFSET, поэтому глубина
+        страницы не влияет на стоимость. columns должны однозначно упорядочивать строки (последней - id)
+        и покрываться индексом вместе с фильтром query. Некорректный курсор даёт первую страницу.
+        """
+        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+        cursor = _decode_cursor(after or before, columns) if (after or before) else None
+        # ?before= с повреждённым курсором - тоже первая страница, а не последняя
+        forward = not before or cursor is None
+        ascending = forward != descending
+        if cursor is not None:
+            key = tuple_(*columns)
+            query = query.filter(key > tuple_(*cursor) if ascending else key < tuple_(*cursor))
+        rows = query.order_by(*[c.asc() if ascending else c.desc() for c in columns]).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not forward:
+            rows.reverse()
+        key_of = lambda row: [getattr(row, c.key) for c in columns]
+        next_cursor = _encode_cursor(key_of(rows[-1])) if rows and (has_more or not forward) else None
+        prev_cursor = _encode_cursor(key_of(rows[0])) if rows and (has_more if not forward else cursor is not None) else None
+        return Page(rows, next_cursor, prev_cursor, limit)
+
     def save(self, entity: T) -> T:
         self.db.add(entity)
         self.db.commit()
@@ -31,17 +96,265 @@ class UserRepository(BaseRepository):
     def get_by_username(self, username: str):
         return self.db.query(User).filter(User.username == username).first()
 
+    def get_by_id_and_role(self, id: str, role: UserRole):
+        # роль известна заранее - грузим конкретный подкласс одним запросом вместо users + догрузки
+        model = {UserRole.CLIENT: Client, UserRole.MANAGER: Manager, UserRole.ADMIN: Admin}.get(role, User)
+        return self.db.query(model).filter(model.id == id).first()
+
+    def get_clients(self, ids: Sequence[str]) -> List[Client]:
+        return self.db.query(Client).filter(Client.id.in_(list(ids))).options(selectinload(Client.profile)).all()
+
 class ProductRepository(BaseRepository):
     def __init__(self, db: Session): super().__init__(db, Product)
 
+    def page_by_category(self, category: str, after: Optional[str] = None, before: Optional[str] = None, limit: int = settings.PAGE_SIZE) -> Page:
+        query = self.db.query(Product).filter(Product.category == category)
+        return self.paginate(query, [Product.name, Product.id], after, before, limit)
+
+    def page_by_manager(self, manager_id: str, after: Optional[str] = None, before: Optional[str] = None, limit: int = settings.PAGE_SIZE) -> Page:
+        query = self.db.query(Product).filter(Product.manager_id == manager_id)
+        return self.paginate(query, [Product.name, Product.id], after, before, limit)
+
+    def ids_for_manager_sales(self, manager_id: str) -> set:
+        # товары без менеджера попадают в продажи любого менеджера (как в get_sales_by_product)
+        return {pid for (pid,) in self.db.query(Product.id).filter(or_(Product.manager_id == manager_id, Product.manager_id.is_(None)))}
+
+class ProductSearchRepository(BaseRepository):
+    """
+    Ранжированный полнотекстовый поиск (bm25; совпадение в названии весит больше, чем в категории и описании).
+    """
+    RANK = f"bm25({SEARCH_TABLE}, 10.0, 1.0, 3.0)"
+
+    def __init__(self, db: Session): super().__init__(db, Product)
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[Tuple[str, float]]:
+        """
+        (id товара, релевантность) по убыванию релевантности.
+        """
+        match = build_match_query(query)
+        if not match: return []
+        rows = self.db.execute(text(
+            f"SELECT p.id, -{self.RANK} FROM {SEARCH_TABLE} JOIN products p ON p.rowid = {SEARCH_TABLE}.rowid "
+            f"WHERE {SEARCH_TABLE} MATCH :match ORDER BY {self.RANK} LIMIT :limit OFFSET :offset"
+        ), {"match": match, "limit": limit, "offset": offset})
+        return [(pid, relevance) for pid, relevance in rows]
+
+    def count_matches(self, query: str) -> int:
+        match = build_match_query(query)
+        if not match: return 0
+        return self.db.execute(text(f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match"), {"match": match}).scalar()
+
+class PopularityRepository(BaseRepository):
+    def __init__(self, db: Session): super().__init__(db, ProductPopularity)
+
+    def increment(self, product_id: str, action: ActionType, amount: int = 1):
+        column = getattr(ProductPopularity, action.value)
+        updated = self.db.query(ProductPopularity).filter(ProductPopularity.product_id == product_id).update(
+            {column: column + amount}, synchronize_session=False
+        )
+        if not updated:
+            self.db.add(ProductPopularity(product_id=product_id, **{action.value: amount}))
+            self.db.flush()
+
+    def get_counts(self) -> Dict[str, Dict[str, int]]:
+        return {row.product_id: row.as_counts() for row in self.db.query(ProductPopularity).all()}
+
+    def rebuild(self):
+        """
+        Полный пересчёт агрегата из таблицы interactions (миграция существующих БД).
+        """
+        self.db.query(ProductPopularity).delete(synchronize_session=False)
+        rows = self.db.query(Interaction.product_id, Interaction.type, func.count(Interaction.id)) \
+            .group_by(Interaction.product_id, Interaction.type).all()
+        aggregated = {}
+        for product_id, action, count in rows:
+            if product_id is None or action is None: continue
+            aggregated.setdefault(product_id, {})[action.value] = count
+        for product_id, counts in aggregated.items():
+            self.db.add(ProductPopularity(product_id=product_id, **counts))
+        self.db.commit()
+
+class NeighborRepository(BaseRepository):
+    def __init__(self, db: Session): super().__init__(db, ProductNeighbor)
+
+    def get_neighbors_map(self) -> Dict[str, List[Tuple[str, float]]]:
+        neighbors = {}
+        rows = self.db.query(ProductNeighbor.product_id, ProductNeighbor.neighbor_id, ProductNeighbor.score) \
+            .order_by(ProductNeighbor.product_id, ProductNeighbor.score.desc())
+        for product_id, neighbor_id, score in rows:
+            neighbors.setdefault(product_id, []).append((neighbor_id, score))
+        return neighbors
+
+    def replace_all(self, neighbors: Dict[str, List[Tuple[str, float]]]):
+        self.db.query(ProductNeighbor).delete(synchronize_session=False)
+        rows = [{"product_id": pid, "neighbor_id": nid, "score": score} for pid, items in neighbors.items() for nid, score in items]
+        if rows:
+            self.db.execute(insert(ProductNeighbor), rows)
+        # похожие товары выводятся на странице товара - её ETag должен смениться
+        CatalogVersionRepository(self.db).bump()
+        self.db.commit()
+
+class CatalogVersionRepository(BaseRepository):
+    ROW_ID = 1
+
+    def __init__(self, db: Session): super().__init__(db, CatalogVersion)
+
+    def get(self) -> Optional[Tuple[int, datetime]]:
+        row = self.db.execute(select(CatalogVersion.version, CatalogVersion.updated_at).where(CatalogVersion.id == self.ROW_ID)).first()
+        return (row.version, row.updated_at) if row else None
+
+    def bump(self):
+        """
+        Изменения товаров учитывают триггеры; явный вызов нужен для остальных данных страниц каталога.
+        """
+        self.db.execute(update(CatalogVersion).where(CatalogVersion.id == self.ROW_ID)
+                        .values(version=CatalogVersion.version + 1, updated_at=datetime.utcnow()))
+
+class ClientFeatureRepository(BaseRepository):
+    def __init__(self, db: Session): super().__init__(db, ClientFeatures)
+
+    def get_by_client(self, client_id: str) -> Optional[ClientFeatures]:
+        return self.db.query(ClientFeatures).filter(ClientFeatures.client_id == client_id).first()
+
+    def get_by_clients(self, client_ids: Sequence[str]) -> Dict[str, ClientFeatures]:
+        return {f.client_id: f for f in self.db.query(ClientFeatures).filter(ClientFeatures.client_id.in_(list(client_ids)))}
+
+    def apply_events(self, events: List[Dict], categories: Dict[str, str]):
+        by_client = defaultdict(list)
+        for e in events:
+            by_client[e["client_id"]].append(e)
+        existing = {f.client_id: f for f in self.db.query(ClientFeatures).filter(ClientFeatures.client_id.in_(list(by_client)))}
+        for client_id, client_events in by_client.items():
+            features = existing.get(client_id)
+            if features is None:
+                features = ClientFeatures(client_id=client_id, category_weights={}, item_weights={}, purchased_ids=[])
+                self.db.add(features)
+            features.apply(client_events, categories, MLStrategy.HISTORY_WEIGHTS,
+                           settings.CLIENT_FEATURE_HALF_LIFE_DAYS, settings.CLIENT_FEATURE_MAX_ITEMS)
+
+    def rebuild(self):
+        """
+        Полный пересчёт признаков из таблицы interactions (миграция существующих БД).
+        """
+        self.db.query(ClientFeatures).delete(synchronize_session=False)
+        rows = self.db.query(Interaction.client_id, Interaction.product_id, Interaction.type, func.count(Interaction.id), func.max(Interaction.timestamp), Product.category) \
+            .join(Product, Interaction.product_id == Product.id) \
+            .filter(Interaction.client_id.isnot(None)) \
+            .group_by(Interaction.client_id, Interaction.product_id, Interaction.type).all()
+        events = [{"client_id": c, "product_id": p, "type": t, "count": n, "timestamp": ts} for c, p, t, n, ts, _ in rows]
+        self.apply_events(events, {p: category for _, p, _, _, _, category in rows})
+        self.db.commit()
+
+class RecommendationListRepository(BaseRepository):
+    GENERATION_KEY = "recommendation_generation"
+
+    def __init__(self, db: Session): super().__init__(db, ClientRecommendations)
+
+    def get_by_client(self, client_id: str) -> Optional[ClientRecommendations]:
+        return self.db.query(ClientRecommendations).filter(ClientRecommendations.client_id == client_id).first()
+
+    def get_by_clients(self, client_ids: Sequence[str]) -> Dict[str, ClientRecommendations]:
+        return {r.client_id: r for r in self.db.query(ClientRecommendations).filter(ClientRecommendations.client_id.in_(list(client_ids)))}
+
+    def get_generation(self) -> int:
+        config = self.db.query(AppConfig).filter(AppConfig.key == self.GENERATION_KEY).first()
+        return config.value if config and config.value else 0
+
+    def publish(self, generation: int, lists: Dict[str, List[str]]):
+        """
+        Заменяет все списки новым поколением и переключает актуальный номер в одной транзакции.
+        """
+        created_at = datetime.utcnow()
+        self.db.query(ClientRecommendations).delete(synchronize_session=False)
+        rows = [{"client_id": cid, "generation": generation, "product_ids": ids, "created_at": created_at} for cid, ids in lists.items()]
+        if rows:
+            self.db.execute(insert(ClientRecommendations), rows)
+        config = self.db.query(AppConfig).filter(AppConfig.key == self.GENERATION_KEY).first()
+        if config:
+            config.value = generation
+        else:
+            self.db.add(AppConfig(key=self.GENERATION_KEY, value=generation))
+        self.db.commit()
+
 class InteractionRepository(BaseRepository):
-    def __init__(self, db: Session): super().__init__(db, Interaction)
+    def __init__(self, db: Session):
+        super().__init__(db, Interaction)
+        self.popularity_repo = PopularityRepository(db)
+        self.feature_repo = ClientFeatureRepository(db)
+
     def get_history(self, client_id: str):
-        return self.db.query(Interaction).filter(Interaction.client_id == client_id).all()
+        # категория товара нужна стратегиям для каждого действия - грузим одним запросом
+        return self.db.query(Interaction).filter(Interaction.client_id == client_id) \
+            .options(joinedload(Interaction.product).load_only(Product.id, Product.category)).all()
+
+    def get_client_item_counts(self):
+        """
+        (client_id, product_id, type, count) - агрегированные взаимодействия для пакетных моделей.
+        """
+        return self.db.query(Interaction.client_id, Interaction.product_id, Interaction.type, func.count(Interaction.id)) \
+            .group_by(Interaction.client_id, Interaction.product_id, Interaction.type).all()
+
+    def get_sales_by_product(self, manager_id: str, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+        """
+        Продажи (PURCHASE) товаров менеджера, сгруппированные по названию: (name, sold, revenue).
+        Товары без менеджера учитываются в отчёте любого менеджера.
+        """
+        query = self.db.query(Product.name, func.count(Interaction.id), func.sum(Product.price)) \
+            .join(Product, Interaction.product_id == Product.id) \
+            .filter(Interaction.type == ActionType.PURCHASE) \
+            .filter(or_(Product.manager_id == manager_id, Product.manager_id.is_(None)))
+        if date_from: query = query.filter(Interaction.timestamp >= date_from)
+        if date_to: query = query.filter(Interaction.timestamp < date_to)
+        return query.group_by(Product.name).order_by(func.min(Interaction.id)).all()
+
+    def stream_sales(self, manager_id: str, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None, batch_size: int = 1000):
+        """
+        Построчная выгрузка продаж (те же условия, что в get_sales_by_product) - курсор с yield_per,
+        строки читаются по партиям (result.partitions()).
+        """
+        query = select(Interaction.timestamp, Interaction.id, Interaction.client_id, Product.id, Product.name, Product.category, Product.price) \
+            .join(Product, Interaction.product_id == Product.id) \
+            .where(Interaction.type == ActionType.PURCHASE) \
+            .where(or_(Product.manager_id == manager_id, Product.manager_id.is_(None)))
+        if date_from: query = query.where(Interaction.timestamp >= date_from)
+        if date_to: query = query.where(Interaction.timestamp < date_to)
+        return self.db.execute(query.order_by(Interaction.timestamp, Interaction.id).execution_options(yield_per=batch_size))
+
+    def record_many(self, events: List[Dict]):
+        """
+        Пакетная запись событий: один INSERT на пачку, по одному UPDATE счётчика на пару (товар, действие)
+        и обновление признаков затронутых клиентов. События по уже удалённым товарам отбрасываются.
+        """
+        product_ids = {e["product_id"] for e in events}
+        categories = dict(self.db.query(Product.id, Product.category).filter(Product.id.in_(product_ids)).all())
+        events = [e for e in events if e["product_id"] in categories]
+        if not events: return
+        self.db.execute(insert(Interaction), events)
+        for (product_id, action), count in Counter((e["product_id"], e["type"]) for e in events).items():
+            self.popularity_repo.increment(product_id, action, count)
+        self.feature_repo.apply_events(events, categories)
+        self.db.commit()
 
 class ReportRepository(BaseRepository):
     def __init__(self, db: Session): super().__init__(db, Report)
 
+    def page_by_manager(self, manager_id: str, after: Optional[str] = None, before: Optional[str] = None, limit: int = settings.PAGE_SIZE) -> Page:
+        query = self.db.query(Report).filter(Report.manager_id == manager_id)
+        return self.paginate(query, [Report.created_at, Report.id], after, before, limit, descending=True)
+
+class OrderRepository(BaseRepository):
+    def __init__(self, db: Session): super().__init__(db, Order)
+
+    def stream_in_period(self, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None, batch_size: int = 1000):
+        query = select(Order.id, Order.created_at, Order.client_id, Order.items_snapshot)
+        if date_from: query = query.where(Order.created_at >= date_from)
+        if date_to: query = query.where(Order.created_at < date_to)
+        return self.db.execute(query.order_by(Order.created_at, Order.id).execution_options(yield_per=batch_size))
+
+    def page_by_client(self, client_id: str, after: Optional[str] = None, before: Optional[str] = None, limit: int = settings.PAGE_SIZE) -> Page:
+        query = self.db.query(Order).filter(Order.client_id == client_id)
+        return self.paginate(query, [Order.created_at, Order.id], after, before, limit, descending=True)
+
 class CartRepository(BaseRepository):
     def __init__(self, db: Session): super().__init__(db, Cart)
     def get_by_client(self, client_id: str):
@@ -0,0 +1,77 @@
+import re
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+TABLE = "products_fts"
+COLUMNS = ("name", "description", "category")
+
+def _normalized(prefix: str, column: str) -> str:
+    # unicode61 приводит кириллицу к нижнему регистру, но "ё" и "е" считает разными буквами
+    return f"replace(replace(coalesce({prefix}{column}, ''), 'ё', 'е'), 'Ё', 'Е')"
+
+def _values(prefix: str) -> str:
+    return ", ".join(_normalized(prefix, column) for column in COLUMNS)
+
+_COLUMN_LIST = ", ".join(COLUMNS)
+
+# Внешнее содержимое (content='products'): текст не дублируется, индекс ссылается на rowid товара.
+# Синхронизацию делают триггеры, поэтому её не обойти ни из контроллеров, ни из fill_bd.py.
+DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5({_COLUMN_LIST}, content='products', content_rowid='rowid', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_ai AFTER INSERT ON products BEGIN "
+    f"INSERT INTO {TABLE}(rowid, {_COLUMN_LIST}) VALUES (new.rowid, {_values('new.')}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_ad AFTER DELETE ON products BEGIN "
+    f"INSERT INTO {TABLE}({TABLE}, rowid, {_COLUMN_LIST}) VALUES ('delete', old.rowid, {_values('old.')}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_au AFTER UPDATE OF {_COLUMN_LIST} ON products BEGIN "
+    f"INSERT INTO {TABLE}({TABLE}, rowid, {_COLUMN_LIST}) VALUES ('delete', old.rowid, {_values('old.')}); "
+    f"INSERT INTO {TABLE}(rowid, {_COLUMN_LIST}) VALUES (new.rowid, {_values('new.')}); END",
+]
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Строка пользователя -> выражение MATCH: каждое слово - префикс ("игр" находит "Игровая"), слова через AND.
+    """
+    tokens = _TOKEN.findall((query or "").lower().replace("ё", "е"))
+    if not tokens: return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+class SearchIndex:
+    """
+    Полнотекстовый индекс товаров (SQLite FTS5) по названию, описанию и категории.
+    Если FTS5 недоступен, available = False и поиск идёт по названию в памяти (ProductFilter).
+    """
+    def __init__(self):
+        self.available = False
+
+    def ensure(self, engine) -> bool:
+        if engine.dialect.name != "sqlite": return False
+        try:
+            with engine.begin() as conn:
+                exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": TABLE}).first()
+                for statement in DDL:
+                    conn.execute(text(statement))
+                if not exists:
+                    self._rebuild(conn)
+        except OperationalError as e:
+            print("Full-text search is unavailable:", e)
+            self.available = False
+            return False
+        self.available = True
+        return True
+
+    def rebuild(self, engine):
+        """
+        Полная переиндексация (нужна, например, после VACUUM: rowid товаров могут измениться).
+        """
+        with engine.begin() as conn:
+            self._rebuild(conn)
+
+    def _rebuild(self, conn):
+        conn.execute(text(f"INSERT INTO {TABLE}({TABLE}) VALUES ('delete-all')"))
+        conn.execute(text(f"INSERT INTO {TABLE}(rowid, {_COLUMN_LIST}) SELECT rowid, {_values('')} FROM products"))
+
+search_index = SearchIndex()
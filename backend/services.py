@@ -1,24 +1,143 @@
+import heapq
+from typing import Optional, List, Tuple, Dict
 from sqlalchemy.orm import Session
-from backend.repositories import ProductRepository, InteractionRepository, CartRepository, ReportRepository
-from backend.strategies import MLStrategy, StatisticalStrategy
-from backend.models import Client, Cart, CartItem, Interaction, Report, ActionType, Order, OrderStatus
+from backend.repositories import InteractionRepository, CartRepository, ReportRepository, ClientFeatureRepository, RecommendationListRepository, ProductSearchRepository
+from backend.strategies import MLStrategy, StatisticalStrategy, ProductFilter
+from backend.vectorized import VectorMLStrategy, VectorStatisticalStrategy
+from backend.cache import catalog_cache
+from backend.ingestion import interaction_writer
+from backend.config import settings
+from backend.metrics import timer
+from backend.search import search_index
+from backend.models import Client, Product, Cart, CartItem, Report, ActionType, Order, OrderStatus
 from datetime import datetime
 
 class RecommendationService:
     def __init__(self, db: Session):
-        self.product_repo = ProductRepository(db)
-        self.interaction_repo = InteractionRepository(db)
-        self.ml = MLStrategy()
-        self.stat = StatisticalStrategy()
-
-    def get_recommendations(self, client: Client, limit=6):
-        history = self.interaction_repo.get_history(client.id)
-        products = self.product_repo.get_all()
-        all_interactions = self.interaction_repo.get_all()
-        strategy = self.ml if history else self.stat
-        scores = strategy.analyze(client, history, products, all_interactions)
-        recommended = sorted(products, key=lambda p: scores.get(p.id, 0), reverse=True)
-        return recommended[:limit]
+        self.feature_repo = ClientFeatureRepository(db)
+        self.list_repo = RecommendationListRepository(db)
+        self.search_repo = ProductSearchRepository(db)
+        if settings.SCORING_ENGINE == "numpy":
+            self.ml = VectorMLStrategy()
+            self.stat = VectorStatisticalStrategy()
+        else:
+            self.ml = MLStrategy()
+            self.stat = StatisticalStrategy()
+
+    def get_recommendations(self, client: Client, limit=6, filters: Optional[ProductFilter] = None):
+        features = self.feature_repo.get_by_client(client.id)
+        if settings.RECOMMENDATION_MODE == "precomputed" and not filters:
+            precomputed = self._get_precomputed(client, features, limit)
+            if precomputed is not None:
+                return precomputed
+        return self._score(client, features, limit, filters)
+
+    def compute_recommendations(self, client: Client, limit=6, filters: Optional[ProductFilter] = None):
+        """
+        Live-расчёт в обход предрассчитанных списков (используется пакетным прогоном).
+        """
+        return self._score(client, self.feature_repo.get_by_client(client.id), limit, filters)
+
+    def get_scored_recommendations(self, client: Client, limit=6) -> List[Tuple[Product, Optional[float]]]:
+        """
+        Рекомендации с оценками стратегии (для JSON API). У предрассчитанного списка оценок нет - None.
+        """
+        row = self.list_repo.get_by_client(client.id) if settings.RECOMMENDATION_MODE == "precomputed" else None
+        return self._scored(client, self.feature_repo.get_by_client(client.id), row, limit)
+
+    def get_batch_recommendations(self, clients: List[Client], limit=6) -> Dict[str, List[Tuple[Product, Optional[float]]]]:
+        """
+        То же для многих клиентов: признаки и предрассчитанные списки читаются одним запросом на всех.
+        """
+        ids = [client.id for client in clients]
+        features = self.feature_repo.get_by_clients(ids)
+        rows = self.list_repo.get_by_clients(ids) if settings.RECOMMENDATION_MODE == "precomputed" else {}
+        return {client.id: self._scored(client, features.get(client.id), rows.get(client.id), limit) for client in clients}
+
+    def _scored(self, client: Client, features, row, limit) -> List[Tuple[Product, Optional[float]]]:
+        if row is not None:
+            products = self._from_list(row, features, limit)
+            if products is not None:
+                return [(p, None) for p in products]
+        return self._score_pairs(client, features, limit, None)
+
+    def _get_precomputed(self, client: Client, features, limit):
+        return self._from_list(self.list_repo.get_by_client(client.id), features, limit)
+
+    def _from_list(self, row, features, limit):
+        """
+        Список из client_recommendations, если он актуален: текущее поколение,
+        клиент не проявлял активность после расчёта и товаров хватает на limit. Иначе None.
+        """
+        snapshot = catalog_cache.get()
+        if not row or row.generation != snapshot.recommendation_generation: return None
+        if features and features.last_activity and features.last_activity > row.created_at: return None
+        products = [snapshot.products_by_id[pid] for pid in row.product_ids if pid in snapshot.products_by_id]
+        if len(products) < limit and len(products) < len(snapshot.products): return None
+        return products[:limit]
+
+    def search(self, client: Client, query: str, page: int = 1, per_page: int = settings.SEARCH_PAGE_SIZE):
+        """
+        Полнотекстовый поиск с персонализацией: первые SEARCH_RERANK_WINDOW совпадений упорядочиваются
+        смесью релевантности и оценки стратегии рекомендаций, дальше - по релевантности.
+        Возвращает (товары страницы, всего совпадений).
+        """
+        offset = (max(page, 1) - 1) * per_page
+        snapshot = catalog_cache.get()
+        if search_index.available:
+            total = self.search_repo.count_matches(query)
+            head = self.search_repo.search(query, settings.SEARCH_RERANK_WINDOW)
+        else:
+            name_filter = ProductFilter(search=query)
+            head = [(p.id, 1.0) for p in snapshot.products if name_filter.matches(p)]
+            total = len(head)
+        ids = self._blend(client, head, snapshot)[offset:offset + per_page]
+        if search_index.available and len(head) == settings.SEARCH_RERANK_WINDOW and offset + per_page > len(head):
+            start = max(offset, len(head))
+            ids += [pid for pid, _ in self.search_repo.search(query, offset + per_page - start, start)]
+        return [snapshot.products_by_id[pid] for pid in ids if pid in snapshot.products_by_id], total
+
+    def _blend(self, client: Client, matches: List[Tuple[str, float]], snapshot) -> List[str]:
+        candidates = [snapshot.products_by_id[pid] for pid, _ in matches if pid in snapshot.products_by_id]
+        weight = settings.SEARCH_PERSONALIZATION_WEIGHT
+        if not candidates or weight <= 0:
+            return [pid for pid, _ in matches]
+        personal = self._personal_scores(client, self.feature_repo.get_by_client(client.id), candidates, snapshot)
+        low, high = min(personal.values()), max(personal.values())
+        max_relevance = max(relevance for _, relevance in matches) or 1.0
+
+        def blended(match):
+            pid, relevance = match
+            score = (personal.get(pid, low) - low) / (high - low) if high > low else 0.0
+            return (1 - weight) * relevance / max_relevance + weight * score
+        return [pid for pid, _ in sorted(matches, key=blended, reverse=True)]
+
+    def _personal_scores(self, client: Client, features, products, snapshot) -> Dict[str, float]:
+        features, strategy = self._prepare(features)
+        with timer("score"):
+            if settings.SCORING_ENGINE == "numpy":
+                scores = strategy.score(client, features, snapshot.index)
+                return {p.id: float(scores[snapshot.index.rows[p.id]]) for p in products}
+            return strategy.analyze(client, features, products, snapshot.popularity, snapshot.neighbors)
+
+    def _prepare(self, features):
+        if features:
+            features = features.decayed(datetime.utcnow(), settings.CLIENT_FEATURE_HALF_LIFE_DAYS)
+        return features, self.ml if features else self.stat
+
+    def _score(self, client: Client, features, limit, filters: Optional[ProductFilter]):
+        return [p for p, _ in self._score_pairs(client, features, limit, filters)]
+
+    def _score_pairs(self, client: Client, features, limit, filters: Optional[ProductFilter]) -> List[Tuple[Product, float]]:
+        features, strategy = self._prepare(features)
+        snapshot = catalog_cache.get()
+        with timer("score"):
+            if settings.SCORING_ENGINE == "numpy":
+                scores = strategy.score(client, features, snapshot.index)
+                return [(p, float(scores[snapshot.index.rows[p.id]])) for p in snapshot.index.top_k(scores, limit, filters)]
+            candidates = [p for p in snapshot.products if filters.matches(p)] if filters else snapshot.products
+            scores = strategy.analyze(client, features, candidates, snapshot.popularity, snapshot.neighbors)
+            return [(p, scores.get(p.id, 0)) for p in heapq.nlargest(limit, candidates, key=lambda p: scores.get(p.id, 0))]
 
 class CartService:
     def __init__(self, db: Session):
@@ -52,8 +171,6 @@ class CartService:
                     "quantity": item.quantity,
                     "price": item.product.price
                 })
-                inter = Interaction(client_id=client_id, product_id=item.product_id, type=ActionType.PURCHASE)
-                self.db.add(inter)
                 self.db.delete(item)
             
             delivery = 15.0 
@@ -66,28 +183,19 @@ class CartService:
             )
             self.db.add(order)
             self.db.commit()
+            # покупки учитываются только для сохранённого заказа
+            for line in snapshot:
+                interaction_writer.record(client_id, line["product_id"], ActionType.PURCHASE)
 
 class ManagerService:
     def __init__(self, db: Session):
         self.report_repo = ReportRepository(db)
         self.interaction_repo = InteractionRepository(db)
 
-    def generate_report(self, manager_id: str):
-        purchases = [i for i in self.interaction_repo.get_all() if i.type == ActionType.PURCHASE]
-        stats = {}
-        
-        for p in purchases:
-            if not p.product: continue
-            if p.product.manager_id != manager_id and p.product.manager_id is not None:
-                continue
-
-            name = p.product.name
-            if name not in stats: stats[name] = {"sold": 0, "revenue": 0}
-            stats[name]["sold"] += 1
-            stats[name]["revenue"] += p.product.price
-        
-        content = [{"product": k, **v} for k, v in stats.items()]
+    def generate_report(self, manager_id: str, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+        sales = self.interaction_repo.get_sales_by_product(manager_id, date_from, date_to)
+        content = [{"product": name, "sold": sold, "revenue": revenue or 0} for name, sold, revenue in sales]
         # Если пусто - все равно создаем
-        report = Report(name=f"Report {len(self.report_repo.get_all())+1}", manager_id=manager_id, content=content)
+        report = Report(name=f"Report {self.report_repo.count()+1}", manager_id=manager_id, content=content)
 
         return self.report_repo.save(report)
@@ -0,0 +1,39 @@
+import heapq
+import math
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.repositories import InteractionRepository, NeighborRepository
+from backend.strategies import MLStrategy
+
+def build_item_neighbors(db: Session, top_n: int = settings.SIMILARITY_TOP_N, max_items_per_client: int = settings.SIMILARITY_MAX_ITEMS_PER_CLIENT) -> Dict[str, List[Tuple[str, float]]]:
+    """
+    Item-item cosine similarity по взвешенным взаимодействиям клиентов (веса действий - как в MLStrategy).
+    У каждого клиента учитываются max_items_per_client самых значимых товаров, чтобы число пар было ограничено.
+    """
+    client_items: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for client_id, product_id, action, count in InteractionRepository(db).get_client_item_counts():
+        if client_id is None or product_id is None: continue
+        client_items[client_id][product_id] += MLStrategy.HISTORY_WEIGHTS.get(action, 0.0) * count
+
+    norms: Dict[str, float] = defaultdict(float)
+    dots: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for items in client_items.values():
+        top = heapq.nlargest(max_items_per_client, items.items(), key=lambda item: item[1])
+        for i, (pid, weight) in enumerate(top):
+            norms[pid] += weight * weight
+            for other, other_weight in top[i + 1:]:
+                dots[pid][other] += weight * other_weight
+                dots[other][pid] += weight * other_weight
+
+    neighbors = {}
+    for pid, row in dots.items():
+        scored = ((other, dot / math.sqrt(norms[pid] * norms[other])) for other, dot in row.items() if dot > 0)
+        neighbors[pid] = heapq.nlargest(top_n, scored, key=lambda item: item[1])
+    return neighbors
+
+def rebuild_neighbors(db: Session) -> int:
+    neighbors = build_item_neighbors(db)
+    NeighborRepository(db).replace_all(neighbors)
+    return len(neighbors)
@@ -1,49 +1,66 @@
 import random
-from typing import List, Dict, Counter
-from backend.models import Client, Interaction, Product, ActionType, AppConfig
-from backend.database import SessionLocal
+from typing import List, Dict, Counter, Optional, Set, Tuple
+from backend.models import Client, ClientFeatures, Product, ActionType
+
+DEFAULT_WEIGHTS = {
+    "view": 1.0,
+    "add_to_cart": 3.0,
+    "review": 4.0,
+    "purchase": 5.0
+}
+
+def compute_global_popularity(products: List[Product], popularity: Dict[str, Dict[str, int]], weights: Dict[str, float]) -> Dict[str, float]:
+    """
+    Считает общую популярность товаров по всей системе
+    (по предрассчитанным счётчикам действий из ProductPopularity)
+    """
+    scores = {}
+    for p in products:
+        counts = popularity.get(p.id, {})
+        scores[p.id] = sum(weights.get(action, 1.0) * count for action, count in counts.items())
+
+    max_score = max(scores.values()) if scores else 1.0
+    if max_score > 0:
+        for pid in scores:
+            scores[pid] /= max_score
+
+    return scores
+
+class ProductFilter:
+    """
+    Предикаты отбора товаров до ранжирования (поиск по названию, категория, диапазон цен).
+    """
+    def __init__(self, search: str = "", category: Optional[str] = None, min_price: Optional[float] = None, max_price: Optional[float] = None):
+        self.search = (search or "").lower()
+        self.category = category
+        self.min_price = min_price
+        self.max_price = max_price
+
+    def __bool__(self):
+        return bool(self.search or self.category or self.min_price is not None or self.max_price is not None)
+
+    def matches(self, p: Product) -> bool:
+        if self.search and self.search not in (p.name or "").lower(): return False
+        if self.category and p.category != self.category: return False
+        if self.min_price is not None and (p.price or 0.0) < self.min_price: return False
+        if self.max_price is not None and (p.price or 0.0) > self.max_price: return False
+        return True
 
 class AnalysisStrategy:
-    def analyze(self, client: Client, history: List[Interaction], products: List[Product], all_interactions: List[Interaction]) -> Dict[str, float]:
+    """
+    features - накопленные признаки клиента (ClientFeatures) или None для клиента без истории,
+    popularity - нормализованная глобальная популярность товаров (см. compute_global_popularity),
+    neighbors - похожие товары {product_id: [(neighbor_id, score), ...]} (см. backend/similarity.py).
+    """
+    def analyze(self, client: Client, features: Optional[ClientFeatures], products: List[Product], popularity: Dict[str, float], neighbors: Optional[Dict[str, List[Tuple[str, float]]]] = None) -> Dict[str, float]:
         raise NotImplementedError
 
-    def _get_global_popularity(self, products: List[Product], all_interactions: List[Interaction]) -> Dict[str, float]:
-        """
-        Считает общую популярность товаров по всей системе
-        """
-        scores = {p.id: 0.0 for p in products}
-        weights = {
-            "view": 1.0,
-            "add_to_cart": 3.0,
-            "review": 4.0,
-            "purchase": 5.0
-        }
-        db = SessionLocal()
-        try:
-            config = db.query(AppConfig).filter(AppConfig.key == "algo_weights").first()
-            if config and config.value:
-                weights.update(config.value)
-        finally:
-            db.close()
-        
-        for action in all_interactions:
-            if action.product_id in scores:
-                weight = weights.get(action.type.value, 1.0)
-                scores[action.product_id] += weight
-        
-        max_score = max(scores.values()) if scores else 1.0
-        if max_score > 0:
-            for pid in scores:
-                scores[pid] /= max_score
-        
-        return scores
-
 class StatisticalStrategy(AnalysisStrategy):
     """
     Для холодных пользователей (Global Popularity + Explicit Interests).
     """
-    def analyze(self, client: Client, history: List[Interaction], products: List[Product], all_interactions: List[Interaction]) -> Dict[str, float]:
-        scores = self._get_global_popularity(products, all_interactions)
+    def analyze(self, client: Client, features: Optional[ClientFeatures], products: List[Product], popularity: Dict[str, float], neighbors: Optional[Dict[str, List[Tuple[str, float]]]] = None) -> Dict[str, float]:
+        scores = {p.id: popularity.get(p.id, 0.0) for p in products}
         
         if client.profile and client.profile.interests:
             for p in products:
@@ -56,39 +73,54 @@ class StatisticalStrategy(AnalysisStrategy):
 
 class MLStrategy(AnalysisStrategy):
     """
-    Content-Based (User Vector) + Collaborative Elements (Global Pop).
+    Content-Based (User Vector) + Collaborative Elements (Global Pop, Item-Item neighbors).
     """
-    def analyze(self, client: Client, history: List[Interaction], products: List[Product], all_interactions: List[Interaction]) -> Dict[str, float]:
-        scores = {p.id: 0.0 for p in products}
-        
+    HISTORY_WEIGHTS = {ActionType.VIEW: 1.0, ActionType.ADD_TO_CART: 2.5, ActionType.PURCHASE: 5.0}
+    SIMILARITY_WEIGHT = 2.0
+
+    def _build_user_vector(self, client: Client, features: Optional[ClientFeatures]) -> Tuple[Counter, Set[str]]:
+        """
+        Нормализованный вектор интересов пользователя по категориям и множество купленных товаров.
+        """
         user_category_vector = Counter()
         
         if client.profile and client.profile.interests:
             for interest in client.profile.interests:
                 user_category_vector[interest] += 2.0
         
-        purchased_ids = set() 
+        purchased_ids = set(features.purchased_ids or []) if features else set()
         
-        for action in history:
-            if not action.product: continue
-            
-            if action.type == ActionType.PURCHASE:
-                purchased_ids.add(action.product_id)
-            
-            cat = action.product.category
-            weight = 0
-            if action.type == ActionType.VIEW: weight = 1.0
-            elif action.type == ActionType.ADD_TO_CART: weight = 2.5
-            elif action.type == ActionType.PURCHASE: weight = 5.0
-            
-            user_category_vector[cat] += weight
+        if features:
+            for cat, weight in (features.category_weights or {}).items():
+                user_category_vector[cat] += weight
 
         total_weight = sum(user_category_vector.values())
         if total_weight > 0:
             for cat in user_category_vector:
                 user_category_vector[cat] /= total_weight
 
-        product_quality = self._get_global_popularity(products, all_interactions)
+        return user_category_vector, purchased_ids
+
+    def _build_similarity_boost(self, features: Optional[ClientFeatures], neighbors: Optional[Dict[str, List[Tuple[str, float]]]]) -> Dict[str, float]:
+        """
+        Соседи товаров из истории, взвешенные по накопленному весу товара; нормализовано к [0, 1].
+        """
+        boost = Counter()
+        if not neighbors or not features: return boost
+        for product_id, weight in (features.item_weights or {}).items():
+            for neighbor_id, score in neighbors.get(product_id, []):
+                boost[neighbor_id] += score * weight
+
+        max_boost = max(boost.values(), default=0.0)
+        if max_boost > 0:
+            for pid in boost:
+                boost[pid] /= max_boost
+        return boost
+
+    def analyze(self, client: Client, features: Optional[ClientFeatures], products: List[Product], popularity: Dict[str, float], neighbors: Optional[Dict[str, List[Tuple[str, float]]]] = None) -> Dict[str, float]:
+        scores = {p.id: 0.0 for p in products}
+        user_category_vector, purchased_ids = self._build_user_vector(client, features)
+        similarity_boost = self._build_similarity_boost(features, neighbors)
 
         for p in products:
             if p.id in purchased_ids:
@@ -98,9 +130,9 @@ class MLStrategy(AnalysisStrategy):
 
             category_relevance = user_category_vector.get(p.category, 0.0) * 5.0 
             
-            quality_score = product_quality.get(p.id, 0.0)
+            quality_score = popularity.get(p.id, 0.0)
             
-            scores[p.id] = category_relevance + quality_score
+            scores[p.id] = category_relevance + quality_score + similarity_boost.get(p.id, 0.0) * self.SIMILARITY_WEIGHT
             
             scores[p.id] += random.random() * 0.01
 
@@ -0,0 +1,90 @@
+import numpy as np
+from typing import List, Dict, Optional, Tuple
+from backend.models import Client, ClientFeatures, Product
+from backend.strategies import StatisticalStrategy, MLStrategy, ProductFilter
+
+class CatalogIndex:
+    """
+    Плотный индекс каталога для векторного скоринга:
+    id товара -> строка, категории -> целочисленные коды, цены и популярность -> массивы.
+    """
+    def __init__(self, products: List[Product], popularity: Dict[str, float], neighbors: Optional[Dict[str, List[Tuple[str, float]]]] = None):
+        self.products = products
+        self.neighbors = neighbors or {}
+        self.rows = {p.id: i for i, p in enumerate(products)}
+        self.category_codes = {cat: code for code, cat in enumerate(sorted({p.category for p in products if p.category}))}
+        self.categories = np.array([self.category_codes.get(p.category, -1) for p in products], dtype=np.int32)
+        self.prices = np.array([p.price or 0.0 for p in products], dtype=np.float64)
+        self.popularity = np.array([popularity.get(p.id, 0.0) for p in products], dtype=np.float64)
+        self.names = np.array([(p.name or "").lower() for p in products], dtype=str)
+
+    def __len__(self):
+        return len(self.products)
+
+    def category_mask(self, categories) -> np.ndarray:
+        codes = [self.category_codes[c] for c in categories if c in self.category_codes]
+        return np.isin(self.categories, codes)
+
+    def filter_mask(self, filters: ProductFilter) -> np.ndarray:
+        mask = np.ones(len(self.products), dtype=bool)
+        if filters.search:
+            mask &= np.char.find(self.names, filters.search) >= 0
+        if filters.category:
+            mask &= self.categories == self.category_codes.get(filters.category, -2)
+        if filters.min_price is not None:
+            mask &= self.prices >= filters.min_price
+        if filters.max_price is not None:
+            mask &= self.prices <= filters.max_price
+        return mask
+
+    def top_k(self, scores: np.ndarray, limit: int, filters: Optional[ProductFilter] = None) -> List[Product]:
+        candidates = np.flatnonzero(self.filter_mask(filters)) if filters else np.arange(len(scores))
+        if limit <= 0 or len(candidates) == 0:
+            return []
+        candidate_scores = scores[candidates]
+        if limit < len(candidates):
+            best = np.argpartition(-candidate_scores, limit - 1)[:limit]
+            best = best[np.argsort(-candidate_scores[best], kind="stable")]
+        else:
+            best = np.argsort(-candidate_scores, kind="stable")
+        return [self.products[i] for i in candidates[best]]
+
+class VectorStatisticalStrategy(StatisticalStrategy):
+    """
+    Векторная версия StatisticalStrategy (результат - массив оценок по строкам CatalogIndex).
+    """
+    def score(self, client: Client, features: Optional[ClientFeatures], index: CatalogIndex) -> np.ndarray:
+        scores = index.popularity.copy()
+
+        if client.profile and client.profile.interests:
+            scores[index.category_mask(client.profile.interests)] += 0.5
+
+        scores += np.random.random(len(index)) * 0.05
+        return scores
+
+class VectorMLStrategy(MLStrategy):
+    """
+    Векторная версия MLStrategy (результат - массив оценок по строкам CatalogIndex).
+    """
+    def score(self, client: Client, features: Optional[ClientFeatures], index: CatalogIndex) -> np.ndarray:
+        user_category_vector, purchased_ids = self._build_user_vector(client, features)
+
+        # последний элемент - нулевой вес для товаров без категории (код -1)
+        category_weights = np.zeros(len(index.category_codes) + 1, dtype=np.float64)
+        for cat, weight in user_category_vector.items():
+            if cat in index.category_codes:
+                category_weights[index.category_codes[cat]] = weight
+
+        category_relevance = category_weights[index.categories] * 5.0
+        scores = category_relevance + index.popularity
+
+        similarity_boost = self._build_similarity_boost(features, index.neighbors)
+        boosted = [(index.rows[pid], boost) for pid, boost in similarity_boost.items() if pid in index.rows]
+        if boosted:
+            rows, values = zip(*boosted)
+            scores[list(rows)] += np.array(values) * self.SIMILARITY_WEIGHT
+        scores += np.random.random(len(index)) * 0.01
+
+        purchased_rows = [index.rows[pid] for pid in purchased_ids if pid in index.rows]
+        scores[purchased_rows] = -1.0
+        return scores
@@ -0,0 +1,101 @@
+"""
+Нагрузочный бенчмарк конкурентности: запускает uvicorn на копии recsys.db и
+параллельно опрашивает основные страницы клиента, печатая пропускную способность и p50/p95/p99.
+
+    python benchmarks/concurrency.py --workers 32 --requests 2000
+"""
+import sys
+import os
+import time
+import shutil
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def wait_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + "/login", timeout=1)
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError("Сервер не запустился")
+
+def register_client(base_url):
+    opener = urllib.request.build_opener(NoRedirect)
+    data = urllib.parse.urlencode({
+        "username": f"bench-{random.randint(0, 10**9)}@bench", "password": "bench",
+        "full_name": "Bench", "gender": "m", "interests": "Games",
+    }).encode()
+    try:
+        opener.open(base_url + "/register", data=data)
+    except urllib.error.HTTPError as e:
+        cookie = e.headers.get("set-cookie", "")
+        return cookie.split(";")[0]
+    raise RuntimeError("Не удалось зарегистрировать клиента")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=32, help="параллельных клиентов")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, "recsys.db")
+    shutil.copy(os.path.join(ROOT_DIR, "recsys.db"), db_path)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_ready(base_url)
+        with sqlite3.connect(db_path) as conn:
+            product_ids = [row[0] for row in conn.execute("SELECT id FROM products")]
+        cookies = [register_client(base_url) for _ in range(args.workers)]
+        paths = ["/client/home", "/client/home?search=" + urllib.parse.quote("игр"), "/client/category/Games", "/client/cart", "/client/orders"]
+
+        def call(i):
+            path = random.choice(paths + [f"/client/product/{random.choice(product_ids)}"])
+            request = urllib.request.Request(base_url + path, headers={"Cookie": cookies[i % len(cookies)]})
+            start = time.perf_counter()
+            with urllib.request.urlopen(request) as response:
+                response.read()
+            return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            latencies = list(pool.map(call, range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+        print(f"workers={args.workers} requests={args.requests}")
+        print(f"throughput: {args.requests / elapsed:.1f} req/s")
+        print(f"p50: {statistics.median(latencies):.1f} ms  p95: {percentile(latencies, 0.95):.1f} ms  "
+              f"p99: {percentile(latencies, 0.99):.1f} ms  max: {max(latencies):.1f} ms")
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Бенчмарк индексов: план запросов (EXPLAIN QUERY PLAN) и задержка горячих запросов
+на синтетической базе до и после создания индексов из backend/models.py.
+
+    python benchmarks/indexes.py --interactions 1000000
+"""
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from backend.database import Base
+import backend.models  # регистрирует таблицы в Base.metadata
+
+CATEGORIES = ["Creativity", "Entertainment", "Food", "Games", "Pets", "Beauty", "Electronics"]
+ACTIONS = ["VIEW"] * 8 + ["ADD_TO_CART"] * 3 + ["PURCHASE"]
+
+QUERIES = {
+    "history": "SELECT id, product_id, type, timestamp FROM interactions WHERE client_id = :client_id",
+    "sales_report": (
+        "SELECT p.name, count(i.id), sum(p.price) FROM interactions i JOIN products p ON i.product_id = p.id "
+        "WHERE i.type = 'PURCHASE' AND (p.manager_id = :manager_id OR p.manager_id IS NULL) "
+        "AND i.timestamp >= :since GROUP BY p.name"
+    ),
+    "popularity_rebuild": "SELECT product_id, type, count(id) FROM interactions GROUP BY product_id, type",
+    "client_orders": "SELECT id, status, created_at FROM orders WHERE client_id = :client_id ORDER BY created_at DESC",
+    "client_cart": "SELECT ci.id, ci.product_id FROM carts c JOIN cart_items ci ON ci.cart_id = c.id WHERE c.client_id = :client_id",
+    "category_products": "SELECT id, name, price FROM products WHERE category = :category",
+    "manager_products": "SELECT id, name, price FROM products WHERE manager_id = :manager_id",
+}
+
+def chunks(rows, size=50000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def populate(engine, args):
+    rnd = random.Random(args.seed)
+    now = datetime.utcnow()
+    managers = [f"mgr-{i}" for i in range(args.managers)]
+    clients = [f"client-{i}" for i in range(args.clients)]
+    products = [f"prod-{i}" for i in range(args.products)]
+
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany(
+            "INSERT INTO products (id, manager_id, name, category, price, description, sku, image_url) VALUES (?, ?, ?, ?, ?, '', '', '')",
+            [(pid, rnd.choice(managers), f"Product {i}", rnd.choice(CATEGORIES), float(rnd.randint(10, 200))) for i, pid in enumerate(products)]
+        )
+        cur.executemany("INSERT INTO carts (id, client_id) VALUES (?, ?)", [(f"cart-{c}", c) for c in clients])
+        cur.executemany(
+            "INSERT INTO cart_items (cart_id, product_id, quantity) VALUES (?, ?, 1)",
+            [(f"cart-{rnd.choice(clients)}", rnd.choice(products)) for _ in range(args.clients * 2)]
+        )
+        cur.executemany(
+            "INSERT INTO orders (id, client_id, status, total_amount, created_at, items_snapshot) VALUES (?, ?, 'COMPLETED', 100.0, ?, '[]')",
+            [(f"order-{i}", rnd.choice(clients), str(now - timedelta(minutes=rnd.randint(0, 525600)))) for i in range(args.orders)]
+        )
+        interactions = (
+            (rnd.choice(clients), rnd.choice(products), rnd.choice(ACTIONS), str(now - timedelta(minutes=rnd.randint(0, 525600))))
+            for _ in range(args.interactions)
+        )
+        for batch in chunks(interactions):
+            cur.executemany("INSERT INTO interactions (client_id, product_id, type, timestamp) VALUES (?, ?, ?, ?)", batch)
+        raw.commit()
+    finally:
+        raw.close()
+    return clients, products, managers
+
+def measure(engine, clients, managers, repeat):
+    rnd = random.Random(0)
+    since = str(datetime.utcnow() - timedelta(days=30))
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            params = lambda: {"client_id": rnd.choice(clients), "manager_id": rnd.choice(managers), "category": rnd.choice(CATEGORIES), "since": since}
+            plan = " | ".join(row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params()))
+            timings = []
+            for _ in range(repeat if name != "popularity_rebuild" else max(1, repeat // 10)):
+                start = time.perf_counter()
+                conn.execute(text(sql), params()).fetchall()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = (statistics.median(timings), plan)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interactions", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--managers", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_indexes.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes if not index.unique]
+    for index in indexes:
+        index.drop(bind=engine)
+
+    start = time.perf_counter()
+    clients, products, managers = populate(engine, args)
+    print(f"Наполнение ({args.interactions} interactions): {time.perf_counter() - start:.1f} c")
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+    before = measure(engine, clients, managers, args.repeat)
+
+    start = time.perf_counter()
+    for index in indexes:
+        index.create(bind=engine)
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"Создание {len(indexes)} индексов: {time.perf_counter() - start:.1f} c\n")
+    after = measure(engine, clients, managers, args.repeat)
+
+    print(f"{'query':<20} {'before, ms':>12} {'after, ms':>12} {'speedup':>9}")
+    for name in QUERIES:
+        b, a = before[name][0], after[name][0]
+        print(f"{name:<20} {b:>12.3f} {a:>12.3f} {b / a if a else 0:>8.1f}x")
+    print()
+    for name in QUERIES:
+        print(f"{name}\n  before: {before[name][1]}\n  after:  {after[name][1]}")
+
+    engine.dispose()
+    os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""
+Набор бенчмарков: синтезирует каталог (категории и названия из REAL_DATA в fill_bd.py) и историю
+взаимодействий заданного масштаба во временной базе, измеряет RecommendationService.get_recommendations
+и search, ManagerService.generate_report, CartService.checkout и основные HTTP-маршруты через приложение FastAPI
+и выводит результаты в JSON (ops/s, p50/p95/p99, пиковый RSS) для сравнения между релизами.
+
+    python benchmarks/suite.py --products 10000 --interactions 1000000 --output results.json
+    python benchmarks/suite.py --db /tmp/bench_1m.db --products 1000000 --interactions 50000000 --skip-neighbors
+    python benchmarks/suite.py --output new.json --baseline results.json
+"""
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import contextlib
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+ACTIONS = ["VIEW"] * 8 + ["ADD_TO_CART"] * 3 + ["PURCHASE"]
+PASSWORD = "bench"
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def peak_rss_mb():
+    if resource is None: return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: килобайты в Linux, байты в macOS
+    return round(usage / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def chunks(rows, size=50000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def populate(engine, args, real_data):
+    """
+    Пишет пользователей, товары, заказы и взаимодействия напрямую через executemany.
+    Популярность товаров скошена (квадрат равномерной величины), 70% действий клиента - в категориях его интересов.
+    """
+    rnd = random.Random(args.seed)
+    now = datetime.utcnow()
+    categories = list(real_data)
+    managers = [f"bench-manager-{i}" for i in range(args.managers)]
+    clients = [f"bench-client-{i}" for i in range(args.clients)]
+    interests = {c: rnd.sample(categories, 2) for c in clients}
+
+    products, by_category = [], {cat: [] for cat in categories}
+    for i in range(args.products):
+        cat = rnd.choice(categories)
+        item = rnd.choice(real_data[cat])
+        pid = f"bench-product-{i}"
+        products.append((pid, rnd.choice(managers), f"{item['name']} #{i}", cat, float(rnd.randint(10, 200)), item["desc"], f"SKU-{i}",
+                         f"https://placehold.co/400x400/333333/ffffff?text={item['kw']}"))
+        by_category[cat].append(pid)
+    product_ids = [p[0] for p in products]
+
+    def pick(pool):
+        return pool[int(len(pool) * rnd.random() ** 2)]
+
+    def interaction():
+        client = rnd.choice(clients)
+        pool = by_category[rnd.choice(interests[client])] if rnd.random() < 0.7 else product_ids
+        return client, pick(pool or product_ids), rnd.choice(ACTIONS), str(now - timedelta(minutes=rnd.randint(0, 525600)))
+
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany(
+            "INSERT INTO users (id, username, password_hash, role, discriminator) VALUES (?, ?, ?, ?, ?)",
+            [(m, f"{m}@bench", PASSWORD, "MANAGER", "manager") for m in managers] + [(c, f"{c}@bench", PASSWORD, "CLIENT", "client") for c in clients]
+        )
+        cur.executemany("INSERT INTO managers (id, organization_name) VALUES (?, 'Bench')", [(m,) for m in managers])
+        cur.executemany("INSERT INTO clients (id, full_name, gender) VALUES (?, 'Bench', 'm')", [(c,) for c in clients])
+        cur.executemany("INSERT INTO profiles (id, client_id, interests) VALUES (?, ?, ?)", [(f"profile-{c}", c, json.dumps(interests[c])) for c in clients])
+        for batch in chunks(products):
+            cur.executemany("INSERT INTO products (id, manager_id, name, category, price, description, sku, image_url) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+        orders = (
+            (f"bench-order-{i}", rnd.choice(clients), "COMPLETED", float(rnd.randint(25, 500)), str(now - timedelta(minutes=rnd.randint(0, 525600))), "[]")
+            for i in range(args.orders)
+        )
+        for batch in chunks(orders):
+            cur.executemany("INSERT INTO orders (id, client_id, status, total_amount, created_at, items_snapshot) VALUES (?, ?, ?, ?, ?, ?)", batch)
+        for batch in chunks(interaction() for _ in range(args.interactions)):
+            cur.executemany("INSERT INTO interactions (client_id, product_id, type, timestamp) VALUES (?, ?, ?, ?)", batch)
+        cur.execute("ANALYZE")
+        raw.commit()
+    finally:
+        raw.close()
+
+def build_derived(args):
+    """
+    Пересчёт производных таблиц, которые приложение строит по interactions.
+    """
+    from backend.database import SessionLocal
+    from backend.repositories import PopularityRepository, ClientFeatureRepository
+    from backend.similarity import rebuild_neighbors
+
+    timings = {}
+    db = SessionLocal()
+    try:
+        for name, rebuild in [("popularity_rebuild", lambda: PopularityRepository(db).rebuild()),
+                              ("client_features_rebuild", lambda: ClientFeatureRepository(db).rebuild()),
+                              ("neighbors_rebuild", None if args.skip_neighbors else lambda: rebuild_neighbors(db))]:
+            if rebuild is None: continue
+            start = time.perf_counter()
+            rebuild()
+            timings[name] = round(time.perf_counter() - start, 3)
+    finally:
+        db.close()
+    return timings
+
+def measure(func, repeat, setup=None, warmup=3):
+    """
+    Вызывает func repeat раз (после warmup прогревочных) и возвращает ops/s и перцентили задержки.
+    setup выполняется вне замера, его результат передаётся в func.
+    """
+    for _ in range(warmup):
+        func(setup() if setup else None)
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    total = sum(timings)
+    ms = [t * 1000 for t in timings]
+    return {
+        "ops": repeat,
+        "ops_per_sec": round(repeat / total, 2) if total else None,
+        "p50_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(percentile(ms, 0.95), 3),
+        "p99_ms": round(percentile(ms, 0.99), 3),
+        "max_ms": round(max(ms), 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def bench_services(args, rnd, client_ids, manager_ids, product_ids):
+    from backend.database import SessionLocal
+    from backend.models import Client
+    from backend.services import RecommendationService, CartService, ManagerService
+    from backend.strategies import ProductFilter
+    from backend.ingestion import interaction_writer
+
+    def recommendations(filters=None):
+        def run(_):
+            db = SessionLocal()
+            try:
+                RecommendationService(db).get_recommendations(db.get(Client, rnd.choice(client_ids)), limit=6, filters=filters)
+            finally:
+                db.close()
+        return run
+
+    def search(_):
+        db = SessionLocal()
+        try:
+            RecommendationService(db).search(db.get(Client, rnd.choice(client_ids)), "игр")
+        finally:
+            db.close()
+
+    def report(_):
+        db = SessionLocal()
+        try:
+            ManagerService(db).generate_report(rnd.choice(manager_ids), date_from=datetime.utcnow() - timedelta(days=30))
+        finally:
+            db.close()
+
+    def fill_cart():
+        client_id = rnd.choice(client_ids)
+        db = SessionLocal()
+        try:
+            service = CartService(db)
+            for pid in rnd.sample(product_ids, min(3, len(product_ids))):
+                service.add_to_cart(client_id, pid)
+        finally:
+            db.close()
+        return client_id
+
+    def checkout(client_id):
+        db = SessionLocal()
+        try:
+            CartService(db).checkout(client_id)
+        finally:
+            db.close()
+
+    results = {
+        "service.recommendations": measure(recommendations(), args.repeat),
+        "service.recommendations_search": measure(recommendations(ProductFilter(search="игр")), args.repeat),
+        "service.search": measure(search, args.repeat),
+        "service.generate_report": measure(report, max(1, args.repeat // 10)),
+        "service.checkout": measure(checkout, args.repeat, setup=fill_cart),
+    }
+    interaction_writer.flush()
+    return results
+
+def bench_http(args, rnd, client_ids, manager_ids, product_ids):
+    from fastapi.testclient import TestClient
+    from backend.main import app
+
+    def login(client, user_id):
+        response = client.post("/login", data={"username": f"{user_id}@bench", "password": PASSWORD}, follow_redirects=False)
+        cookie = response.headers["set-cookie"].split(";")[0]
+        client.cookies.clear()
+        return cookie
+
+    results = {}
+    with TestClient(app) as client:
+        client_cookies = [login(client, cid) for cid in rnd.sample(client_ids, min(16, len(client_ids)))]
+        manager_cookie = login(client, manager_ids[0])
+        routes = [
+            ("GET /client/home", lambda: "/client/home", client_cookies),
+            ("GET /client/home?search", lambda: "/client/home?search=игр", client_cookies),
+            ("GET /client/category/{cat}", lambda: f"/client/category/{rnd.choice(args.categories)}", client_cookies),
+            ("GET /client/product/{pid}", lambda: f"/client/product/{rnd.choice(product_ids)}", client_cookies),
+            ("GET /client/cart", lambda: "/client/cart", client_cookies),
+            ("GET /client/orders", lambda: "/client/orders", client_cookies),
+            ("GET /manager/products", lambda: "/manager/products", [manager_cookie]),
+        ]
+        for name, path, cookies in routes:
+            def run(_, path=path, cookies=cookies):
+                response = client.get(path(), headers={"Cookie": rnd.choice(cookies)})
+                if response.status_code != 200:
+                    raise RuntimeError(f"{name}: HTTP {response.status_code}")
+            results["http." + name] = measure(run, args.repeat)
+
+        # JSON API: 50 клиентов одним запросом (сервисный токен)
+        from backend.config import settings
+        settings.API_TOKEN = settings.API_TOKEN or "bench-token"
+        def batch(_):
+            response = client.post("/api/recommendations/batch", json={"client_ids": rnd.sample(client_ids, min(50, len(client_ids)))},
+                                   headers={"Authorization": f"Bearer {settings.API_TOKEN}"})
+            if response.status_code != 200:
+                raise RuntimeError(f"batch: HTTP {response.status_code}")
+        results["http.POST /api/recommendations/batch"] = measure(batch, max(1, args.repeat // 10))
+
+        # повторный визит: браузер присылает ETag, сервер отвечает 304 без рендеринга
+        cookie = client_cookies[0]
+        path = f"/client/category/{args.categories[0]}"
+        etag = client.get(path, headers={"Cookie": cookie}).headers.get("etag")
+        def revalidate(_):
+            response = client.get(path, headers={"Cookie": cookie, "If-None-Match": etag or ""})
+            if response.status_code not in (200, 304):
+                raise RuntimeError(f"revalidate: HTTP {response.status_code}")
+        results["http.GET /client/category/{cat} 304"] = measure(revalidate, args.repeat)
+    return results
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"{'benchmark':<36} {'base ops/s':>12} {'new ops/s':>12} {'change':>8} {'base p95':>10} {'new p95':>10}", file=sys.stderr)
+    for name, new in results.items():
+        old = baseline.get(name)
+        if not old: continue
+        change = (new["ops_per_sec"] / old["ops_per_sec"] - 1) * 100 if old["ops_per_sec"] else 0
+        print(f"{name:<36} {old['ops_per_sec']:>12.1f} {new['ops_per_sec']:>12.1f} {change:>+7.1f}% {old['p95_ms']:>10.2f} {new['p95_ms']:>10.2f}", file=sys.stderr)
+
+def run(args, reuse):
+    from backend.config import settings
+    from backend.database import engine, SessionLocal
+    import backend.main  # создаёт таблицы и индексы
+    from backend.models import Client, Manager, Product
+    from backend.repositories import InteractionRepository
+    from fill_bd import REAL_DATA
+
+    setup = {}
+    if not reuse:
+        start = time.perf_counter()
+        populate(engine, args, REAL_DATA)
+        setup["populate"] = round(time.perf_counter() - start, 3)
+        setup.update(build_derived(args))
+
+    db = SessionLocal()
+    try:
+        client_ids = [cid for (cid,) in db.query(Client.id).filter(Client.username.like("%@bench"))]
+        manager_ids = [mid for (mid,) in db.query(Manager.id).filter(Manager.username.like("%@bench"))]
+        product_ids = [pid for (pid,) in db.query(Product.id)]
+        args.categories = [cat for (cat,) in db.query(Product.category).distinct()]
+        counts = {"products": len(product_ids), "clients": len(client_ids), "managers": len(manager_ids),
+                  "interactions": InteractionRepository(db).count()}
+    finally:
+        db.close()
+
+    rnd = random.Random(args.seed)
+    results = bench_services(args, rnd, client_ids, manager_ids, product_ids)
+    if not args.skip_http:
+        results.update(bench_http(args, rnd, client_ids, manager_ids, product_ids))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scoring_engine": settings.SCORING_ENGINE,
+            "recommendation_mode": settings.RECOMMENDATION_MODE,
+            "db_profile": settings.DB_PROFILE,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "dataset": counts,
+        },
+        "setup_seconds": setup,
+        "results": results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    engine.dispose()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--interactions", type=int, default=1_000_000)
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--managers", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=200, help="замеров на бенчмарк (отчёт - repeat / 10)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="файл базы; если уже существует, синтез пропускается")
+    parser.add_argument("--skip-neighbors", action="store_true", help="не строить похожие товары (долго на больших объёмах)")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--output", help="файл для JSON (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения (таблица в stderr)")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    db_path = args.db
+    if not db_path:
+        tmp_dir = tempfile.mkdtemp()
+        db_path = os.path.join(tmp_dir, "bench_suite.db")
+    reuse = os.path.exists(db_path)
+    # Настройки читаются при импорте backend, поэтому база подменяется до него
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    # сообщения seed и прочие print приложения не должны попадать в JSON на stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args, reuse)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.baseline:
+        compare(report["results"], args.baseline)
+
+    if tmp_dir:
+        os.remove(db_path)
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(db_path + suffix): os.remove(db_path + suffix)
+        os.rmdir(tmp_dir)
+
+if __name__ == "__main__":
+    main()
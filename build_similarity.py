@@ -0,0 +1,24 @@
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.database import SessionLocal, Base, engine
+from backend.similarity import rebuild_neighbors
+import backend.models
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        count = rebuild_neighbors(db)
+        print(f"✅ Похожие товары пересчитаны для {count} товаров за {time.perf_counter() - start:.1f} c.")
+    except Exception as e:
+        print(f"Ошибка: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from backend.database import SessionLocal
 from backend.models import Product
+from backend.cache import catalog_cache
 
 REAL_DATA = {
     "Food": [
@@ -86,28 +87,35 @@ REAL_DATA = {
     ]
 }
 
-def update_products():
+def update_products(chunk_size=5000):
     db = SessionLocal()
     try:
-        products = db.query(Product).all()
-        print(f"Найдено {len(products)} товаров. Обновляем...")
+        print(f"Найдено {db.query(Product).count()} товаров. Обновляем...")
         
         counters = {cat: 0 for cat in REAL_DATA}
 
-        for p in products:
-            if p.category in REAL_DATA:
+        # каталог обходится пачками по id, каждая пачка - своя транзакция: память не растёт с размером каталога
+        last_id = ""
+        while True:
+            products = db.query(Product).filter(Product.id > last_id).order_by(Product.id).limit(chunk_size).all()
+            if not products: break
+            for p in products:
+                if p.category in REAL_DATA:
 
-                idx = counters[p.category] % len(REAL_DATA[p.category])
-                data = REAL_DATA[p.category][idx]
-                
-                p.name = data["name"]
-                p.description = data["desc"]
-                
-                p.image_url = f"https://loremflickr.com/400/400/{data['kw']}?lock={p.id}"
-                
-                counters[p.category] += 1
+                    idx = counters[p.category] % len(REAL_DATA[p.category])
+                    data = REAL_DATA[p.category][idx]
+                    
+                    p.name = data["name"]
+                    p.description = data["desc"]
+                    
+                    p.image_url = f"https://loremflickr.com/400/400/{data['kw']}?lock={p.id}"
+                    
+                    counters[p.category] += 1
+            last_id = products[-1].id
+            db.commit()
+            db.expunge_all()
         
-        db.commit()
+        catalog_cache.invalidate()
         print("✅ Успешно! Все товары обновлены красивыми данными.")
         
     except Exception as e:
@@ -0,0 +1,65 @@
+import sys
+import os
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.config import settings
+from backend.database import Base, SessionLocal, engine
+from backend.search import search_index
+from backend.http_cache import catalog_versions
+from backend.catalog_io import ProductImporter, FORMATS, detect_format, export_products
+from backend.models import Manager
+
+def find_manager(username):
+    if username is None: return None
+    db = SessionLocal()
+    try:
+        manager = db.query(Manager).filter(Manager.username == username).first()
+    finally:
+        db.close()
+    if not manager:
+        sys.exit(f"Менеджер {username} не найден")
+    return manager.id
+
+def main():
+    parser = argparse.ArgumentParser(description="Потоковый импорт/экспорт товаров (CSV или JSON Lines)")
+    parser.add_argument("path", help="файл каталога; '-' - stdin/stdout")
+    parser.add_argument("--manager", help="username менеджера-владельца товаров")
+    parser.add_argument("--format", choices=FORMATS, help="по умолчанию - по расширению файла")
+    parser.add_argument("--chunk-size", type=int, default=settings.IMPORT_CHUNK_SIZE, help="строк на одну транзакцию")
+    parser.add_argument("--export", action="store_true", help="выгрузить товары в файл вместо загрузки")
+    args = parser.parse_args()
+
+    # триггеры FTS и версии каталога должны существовать до вставки
+    Base.metadata.create_all(bind=engine)
+    search_index.ensure(engine)
+    catalog_versions.ensure(engine)
+    manager_id = find_manager(args.manager)
+    fmt = args.format or detect_format(args.path)
+    start = time.perf_counter()
+
+    if args.export:
+        out = sys.stdout if args.path == "-" else open(args.path, "w", encoding="utf-8", newline="")
+        try:
+            for chunk in export_products(manager_id, fmt, args.chunk_size):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout: out.close()
+        print(f"✅ Выгрузка за {time.perf_counter() - start:.1f} c.", file=sys.stderr)
+        return
+
+    source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8-sig", newline="")
+    try:
+        result = ProductImporter(manager_id, args.chunk_size).run(source, fmt)
+    finally:
+        if source is not sys.stdin: source.close()
+    for line_num, message in result.errors:
+        print(f"строка {line_num}: {message}", file=sys.stderr)
+    if result.error:
+        print(f"Импорт прерван: {result.error}", file=sys.stderr)
+    print(f"✅ Загружено {result.inserted} товаров, пропущено {result.failed} строк за {time.perf_counter() - start:.1f} c.")
+
+if __name__ == "__main__":
+    main()
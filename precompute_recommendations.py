@@ -0,0 +1,26 @@
+import sys
+import os
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.config import settings
+from backend.database import Base, engine
+from backend.precompute import precompute_all
+import backend.models
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный расчёт рекомендаций для всех клиентов")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию - по числу CPU)")
+    parser.add_argument("--top-n", type=int, default=settings.PRECOMPUTED_TOP_N)
+    parser.add_argument("--chunk-size", type=int, default=500, help="клиентов на одну задачу пула")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    generation, count = precompute_all(args.workers, args.top_n, args.chunk_size)
+    print(f"✅ Поколение {generation}: рекомендации для {count} клиентов за {time.perf_counter() - start:.1f} c.")
+
+if __name__ == "__main__":
+    main()
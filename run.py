@@ -6,5 +6,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 if __name__ == "__main__":
     print("Запуск системы...")
+    # локальный сервер для разработки: правки шаблонов видны без перезапуска
+    os.environ.setdefault("TEMPLATE_AUTO_RELOAD", "1")
 
     uvicorn.run("backend.main:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+
+# Отдельная БД для тестов; переменные окружения читаются при импорте backend.config
+_db_dir = tempfile.mkdtemp(prefix="recsys-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("DB_PROFILE", "default")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from backend.database import Base, SessionLocal, engine
+from backend.cache import catalog_cache
+from backend.models import Client, Manager, Product, Profile, UserRole
+
+CATEGORIES = ["Games", "Pets", "Food"]
+
+@pytest.fixture()
+def db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    catalog_cache.invalidate()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture()
+def shop(db):
+    """
+    (manager_id, client_id, product_ids): 30 товаров трёх категорий ценой 10..39, клиент с интересом Games.
+    """
+    manager = Manager(username="m@test", password_hash="x", role=UserRole.MANAGER, organization_name="Test")
+    client = Client(username="c@test", password_hash="x", role=UserRole.CLIENT, full_name="Test")
+    db.add_all([manager, client])
+    db.flush()
+    db.add(Profile(client_id=client.id, interests=["Games"]))
+    products = [Product(name=f"Product {i}", category=CATEGORIES[i % len(CATEGORIES)], price=10.0 + i, manager_id=manager.id) for i in range(30)]
+    db.add_all(products)
+    db.commit()
+    return manager.id, client.id, [p.id for p in products]
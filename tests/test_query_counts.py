@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from backend.database import engine
+from backend.models import Client, ActionType
+from backend.repositories import InteractionRepository
+from backend.services import RecommendationService, ManagerService
+
+def add_history(db, client_id, product_ids, count):
+    start = datetime.utcnow() - timedelta(days=1)
+    actions = [ActionType.VIEW, ActionType.ADD_TO_CART, ActionType.PURCHASE]
+    events = [{"client_id": client_id, "product_id": product_ids[i % len(product_ids)], "type": actions[i % len(actions)],
+               "timestamp": start + timedelta(seconds=i)} for i in range(count)]
+    InteractionRepository(db).record_many(events)
+    db.commit()
+
+def count_statements(func) -> int:
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        func()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return len(statements)
+
+def test_history_loads_with_constant_queries(db, shop):
+    _, client_id, product_ids = shop
+
+    def load():
+        db.expunge_all()
+        history = InteractionRepository(db).get_history(client_id)
+        return [i.product.category for i in history]
+
+    add_history(db, client_id, product_ids, 5)
+    short = count_statements(load)
+    add_history(db, client_id, product_ids, 300)
+    assert count_statements(load) == short
+
+def test_recommendations_use_constant_queries(db, shop):
+    _, client_id, product_ids = shop
+
+    def recommend():
+        db.expunge_all()
+        RecommendationService(db).get_recommendations(db.get(Client, client_id), limit=10)
+
+    add_history(db, client_id, product_ids, 5)
+    recommend()  # срез каталога строится при первом обращении
+    short = count_statements(recommend)
+    add_history(db, client_id, product_ids, 300)
+    assert count_statements(recommend) == short
+
+def test_report_uses_constant_queries(db, shop):
+    manager_id, client_id, product_ids = shop
+
+    def report():
+        ManagerService(db).generate_report(manager_id)
+
+    add_history(db, client_id, product_ids, 5)
+    short = count_statements(report)
+    add_history(db, client_id, product_ids, 300)
+    assert count_statements(report) == short
@@ -0,0 +1,36 @@
+from datetime import datetime
+import pytest
+from backend.config import settings
+from backend.models import Client, ActionType
+from backend.repositories import InteractionRepository
+from backend.services import RecommendationService
+from backend.strategies import ProductFilter
+
+@pytest.fixture(params=["python", "numpy"])
+def engine_name(request, monkeypatch):
+    monkeypatch.setattr(settings, "SCORING_ENGINE", request.param)
+    monkeypatch.setattr(settings, "RECOMMENDATION_MODE", "live")
+    return request.param
+
+@pytest.fixture(params=["cold", "warm"])
+def client(request, db, shop):
+    _, client_id, product_ids = shop
+    if request.param == "warm":
+        events = [{"client_id": client_id, "product_id": pid, "type": ActionType.PURCHASE, "timestamp": datetime.utcnow()} for pid in product_ids[:6]]
+        InteractionRepository(db).record_many(events)
+        db.commit()
+    return db.get(Client, client_id)
+
+def test_filters_apply_before_ranking(engine_name, db, client):
+    service = RecommendationService(db)
+    filters = ProductFilter(category="Pets", min_price=20, max_price=35)
+    matching = {p.id for p in service.get_recommendations(client, limit=30) if p.category == "Pets" and 20 <= p.price <= 35}
+
+    top = service.get_recommendations(client, limit=3, filters=filters)
+    assert len(top) == 3
+    assert all(p.category == "Pets" and 20 <= p.price <= 35 for p in top)
+    # весь подходящий каталог, а не отфильтрованные первые limit рекомендаций
+    assert {p.id for p in service.get_recommendations(client, limit=30, filters=filters)} == matching
+
+def test_filter_without_matches_returns_nothing(engine_name, db, client):
+    assert RecommendationService(db).get_recommendations(client, limit=5, filters=ProductFilter(min_price=1000)) == []